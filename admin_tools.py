@@ -3,13 +3,15 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 import json
+import keyboards
+from broadcast import AUDIENCE_NAMES
 
 class AdminTools:
     @staticmethod
-    async def handle_admin_buttons(query, data, db):
+    async def handle_admin_buttons(query, data, db, context=None):
         user_id = query.from_user.id
         
-        if not db.is_admin(user_id):
+        if not await db.is_admin(user_id):
             await query.edit_message_text("❌ Access denied!")
             return
         
@@ -45,18 +47,28 @@ class AdminTools:
         
         elif data == 'admin_branding':
             await AdminTools.branding_menu(query, db)
+        
+        elif data.startswith('admin_list_'):
+            await AdminTools.show_listing(query, data, db)
+        
+        elif data == 'admin_approve_all':
+            await AdminTools.confirm_approve_all(query, db)
+        
+        elif data.startswith('admin_approve_') or data.startswith('admin_reject_'):
+            await AdminTools.review_deposits(query, data, db, context)
+        
+        elif data in USER_CONTROL_ACTIONS:
+            await AdminTools.request_user_id(query, data, context)
+        
+        elif data in BROADCAST_TARGETS:
+            await AdminTools.request_broadcast_message(query, data, context)
     
     @staticmethod
     async def edit_buttons_menu(query, db):
-        buttons = {
-            'button_balance': db.get_setting('button_balance'),
-            'button_services': db.get_setting('button_services'),
-            'button_prices': db.get_setting('button_prices'),
-            'button_deposit': db.get_setting('button_deposit'),
-            'button_invite': db.get_setting('button_invite'),
-            'button_support': db.get_setting('button_support'),
-            'button_stats': db.get_setting('button_stats')
-        }
+        buttons = db.get_settings([
+            'button_balance', 'button_services', 'button_prices', 'button_deposit',
+            'button_invite', 'button_support', 'button_stats'
+        ])
         
         text = "⚙️ *Edit Menu Buttons*\n\n"
         for key, value in buttons.items():
@@ -81,9 +93,10 @@ class AdminTools:
     
     @staticmethod
     async def edit_deposit_menu(query, db):
-        instructions = db.get_setting('deposit_instructions')
-        payment_numbers = json.loads(db.get_setting('payment_numbers'))
-        min_deposit = db.get_setting('deposit_minimum')
+        settings = db.get_settings(['deposit_instructions', 'payment_numbers', 'deposit_minimum'])
+        instructions = settings['deposit_instructions']
+        payment_numbers = json.loads(settings['payment_numbers'])
+        min_deposit = settings['deposit_minimum']
         
         text = "💳 *Deposit Settings*\n\n"
         text += f"Minimum Deposit: {min_deposit}৳\n\n"
@@ -107,10 +120,11 @@ class AdminTools:
     
     @staticmethod
     async def group_settings_menu(query, db):
-        group_check = db.get_setting('group_check')
-        group_link = db.get_setting('group_link')
-        group_message = db.get_setting('group_message')
-        verify_button = db.get_setting('verify_button')
+        settings = db.get_settings(['group_check', 'group_link', 'group_message', 'verify_button'])
+        group_check = settings['group_check']
+        group_link = settings['group_link']
+        group_message = settings['group_message']
+        verify_button = settings['verify_button']
         
         status = "✅ Enabled" if group_check == '1' else "❌ Disabled"
         
@@ -159,9 +173,10 @@ class AdminTools:
     
     @staticmethod
     async def branding_menu(query, db):
-        bot_name = db.get_setting('bot_name')
-        footer_text = db.get_setting('footer_text')
-        theme_emoji = db.get_setting('theme_emoji')
+        settings = db.get_settings(['bot_name', 'footer_text', 'theme_emoji'])
+        bot_name = settings['bot_name']
+        footer_text = settings['footer_text']
+        theme_emoji = settings['theme_emoji']
         
         text = "🎨 *Branding Settings*\n\n"
         text += f"Bot Name: {bot_name}\n"
@@ -204,8 +219,193 @@ class AdminTools:
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
     
+    @staticmethod
+    async def request_broadcast_message(query, data, context):
+        # The next message from this admin becomes the broadcast content
+        context.user_data['broadcast_target'] = data
+        audience, mode = BROADCAST_TARGETS[data]
+        action = "forward" if mode == 'forward' else "send"
+        
+        await query.edit_message_text(
+            "📢 *New Broadcast*\n\n"
+            f"Audience: {AUDIENCE_NAMES[audience]}\n\n"
+            f"Send the message you want to {action} to these users:",
+            parse_mode=ParseMode.MARKDOWN
+        )
+    
+    @staticmethod
+    async def show_listing(query, data, db):
+        # admin_list_<kind> or admin_list_<kind>_<n|p>_<cursor>
+        parts = data.split('_')
+        kind = parts[2]
+        if kind not in LISTINGS:
+            return
+        
+        forward, cursor = True, None
+        if len(parts) == 5:
+            forward, cursor = parts[3] == 'n', int(parts[4])
+        
+        title, method, key, format_row = LISTINGS[kind]
+        page = await getattr(db, method)(cursor, forward)
+        rows = page['rows']
+        
+        text = f"{title}\n\n"
+        if rows:
+            text += "\n".join(format_row(row) for row in rows)
+        else:
+            text += "Nothing to show."
+        
+        prev_data = f"admin_list_{kind}_p_{rows[0][key]}" if rows and page['has_prev'] else None
+        next_data = f"admin_list_{kind}_n_{rows[-1][key]}" if rows and page['has_next'] else None
+        
+        action_rows = []
+        if kind == 'deposits' and rows:
+            # Pending deposits are listed by id, so a page is an id range
+            first_id, last_id = rows[0]['id'], rows[-1]['id']
+            action_rows = [
+                [
+                    InlineKeyboardButton("✅ Approve page", callback_data=f"admin_approve_{first_id}_{last_id}"),
+                    InlineKeyboardButton("❌ Reject page", callback_data=f"admin_reject_{first_id}_{last_id}")
+                ],
+                [InlineKeyboardButton("✅ Approve all pending", callback_data='admin_approve_all')]
+            ]
+        
+        await query.edit_message_text(
+            text,
+            reply_markup=keyboards.cursor_pagination_keyboard(prev_data, next_data, action_rows=action_rows)
+        )
+    
+    @staticmethod
+    async def confirm_approve_all(query, db):
+        count, total, last_id = await db.get_pending_deposits_summary()
+        if not count:
+            await query.edit_message_text(
+                "📥 No pending deposits.",
+                reply_markup=keyboards.cursor_pagination_keyboard(None, None)
+            )
+            return
+        
+        # Bounded by the current highest id, so deposits arriving after this
+        # screen was shown are not approved unseen
+        keyboard = [
+            [InlineKeyboardButton(f"✅ Approve {count} deposits", callback_data=f"admin_approve_0_{last_id}")],
+            [InlineKeyboardButton("🔙 Back", callback_data='admin_list_deposits')]
+        ]
+        await query.edit_message_text(
+            f"📥 *Approve all pending deposits?*\n\n"
+            f"Deposits: {count}\n"
+            f"Total: {total}৳",
+            parse_mode=ParseMode.MARKDOWN,
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+    
+    @staticmethod
+    async def review_deposits(query, data, db, context):
+        # admin_<approve|reject>_<first id>_<last id>
+        _, action, first_id, last_id = data.split('_')
+        approve = action == 'approve'
+        reviewed = await db.review_deposits(int(first_id), int(last_id), query.from_user.id, approve)
+        
+        if approve:
+            template = "✅ Your deposit of {amount}৳ (TRX `{trx}`) has been approved and added to your balance."
+        else:
+            template = "❌ Your deposit of {amount}৳ (TRX `{trx}`) was rejected. Contact support if this is a mistake."
+        context.bot_data['user_notifier'].send_many([
+            (user_id, template.format(amount=amount, trx=trx_id))
+            for _, user_id, amount, trx_id in reviewed
+        ])
+        
+        status = "approved" if approve else "rejected"
+        total = sum(amount for _, _, amount, _ in reviewed)
+        users = len({user_id for _, user_id, _, _ in reviewed})
+        await query.edit_message_text(
+            f"📥 {len(reviewed)} deposits {status} ({total}৳, {users} users).\n"
+            "Users are being notified.",
+            reply_markup=InlineKeyboardMarkup([
+                [InlineKeyboardButton("📥 Pending Deposits", callback_data='admin_list_deposits')],
+                [InlineKeyboardButton("🔙 Back", callback_data='admin_panel')]
+            ])
+        )
+    
+    @staticmethod
+    async def request_user_id(query, data, context):
+        context.user_data['user_control'] = data
+        await query.edit_message_text(
+            f"👤 *{USER_CONTROL_ACTIONS[data]}*\n\n"
+            "Send the user ID:",
+            parse_mode=ParseMode.MARKDOWN
+        )
+    
+    @staticmethod
+    async def apply_user_control(update, action, db):
+        try:
+            target_id = int(update.message.text.strip())
+        except ValueError:
+            await update.message.reply_text("❌ Please send a numeric user ID.")
+            return
+        
+        # Also updates the in-memory banned set used by the pre-handler
+        banned = action == 'ban_user'
+        if await db.set_user_banned(target_id, banned):
+            status = "banned" if banned else "unbanned"
+            await update.message.reply_text(f"✅ User {target_id} {status}.")
+        else:
+            await update.message.reply_text(f"❌ User {target_id} not found.")
+    
     @staticmethod
     async def handle_admin_message(update, context, db):
+        # A pending broadcast takes the next admin message as its content
+        target = context.user_data.pop('broadcast_target', None)
+        if target:
+            audience, mode = BROADCAST_TARGETS[target]
+            broadcaster = context.bot_data['broadcaster']
+            job_id = await broadcaster.start(
+                update.effective_user.id,
+                audience,
+                update.message.chat_id,
+                update.message.message_id,
+                mode
+            )
+            await update.message.reply_text(f"📢 Broadcast #{job_id} started. Progress will be reported here.")
+            return
+        
+        action = context.user_data.pop('user_control', None)
+        if action:
+            await AdminTools.apply_user_control(update, action, db)
+            return
+        
         # Handle admin text commands for editing settings
-        # Implementation depends on state management
-        pass
+        # Implementation depends on your state management
+
+# Broadcast button -> (audience, delivery mode)
+BROADCAST_TARGETS = {
+    'broadcast_all': ('all', 'copy'),
+    'broadcast_active': ('active', 'copy'),
+    'broadcast_depositors': ('depositors', 'copy'),
+    'broadcast_forward': ('all', 'forward')
+}
+
+# Listing kind -> (title, AsyncDatabase method, cursor column, row formatter)
+LISTINGS = {
+    'deposits': (
+        "📥 Pending Deposits", 'list_pending_deposits', 'id',
+        lambda row: f"#{row['id']} | user {row['user_id']} | {row['amount']}৳ | TRX {row['transaction_id']}"
+    ),
+    'orders': (
+        "📦 Recent Orders", 'list_orders', 'id',
+        lambda row: f"#{row['id']} | user {row['user_id']} | service {row['service_id']} x{row['quantity']} | {row['total_price']}৳ | {row['status']}"
+    ),
+    'users': (
+        "👥 Users", 'list_users', 'user_id',
+        lambda row: f"{row['user_id']} | @{row['username'] or '-'} | {row['balance']}৳ | {row['total_orders']} orders" + (" | 🚫" if row['banned'] else "")
+    )
+}
+
+# User control button -> title
+USER_CONTROL_ACTIONS = {
+    'ban_user': 'Ban User',
+    'unban_user': 'Unban User'
+}
+
+handle_admin_buttons = AdminTools.handle_admin_buttons
+handle_admin_message = AdminTools.handle_admin_message
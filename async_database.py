@@ -0,0 +1,308 @@
+# async_database.py
+import asyncio
+import contextvars
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from database import Database
+from config import Config
+import metrics
+from user_cache import UserProfile, ProfileCache
+import sql_trace
+
+# Methods that only read and can run on any pooled reader connection
+READ_METHODS = (
+    'is_user_banned', 'get_user_balance', 'get_user_total_orders',
+    'get_user_total_deposits', 'get_user_referrals', 'get_banned_user_ids', 'get_user_profile',
+    'get_service_categories', 'get_services_by_category', 'get_all_services',
+    'get_service', 'get_last_order_id', 'get_statistics', 'get_broadcast_job',
+    'get_unfinished_broadcasts', 'get_broadcast_recipients', 'list_pending_deposits',
+    'list_orders', 'list_users', 'get_scheduled_deletions', 'get_conversation_states',
+    'get_all_user_data', 'get_pending_deposits_summary'
+)
+
+# Methods that write and are serialized on the single writer connection
+WRITE_METHODS = (
+    'update_user_profiles', 'add_service', 'update_service', 'create_deposit', 'set_setting',
+    'create_broadcast_job', 'update_broadcast_progress', 'finish_broadcast',
+    'add_scheduled_deletions', 'remove_scheduled_deletions', 'save_persistence'
+)
+
+# Awaitable counterpart of Database that keeps SQLite off the event loop.
+# Reads run on a small pool of read-only WAL connections, writes run one at
+# a time on a dedicated writer connection.
+class AsyncDatabase:
+    def __init__(self, db_name="smm_panel.db", readers=4, commit_window=None, commit_batch=None):
+        self.db_name = db_name
+        
+        # The writer owns the schema and the settings cache
+        self.writer = Database(db_name)
+        self.writer.conn.execute('PRAGMA busy_timeout=5000')
+        self.writer.load_settings()
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        
+        # Group commit: concurrent writes are queued and committed together
+        self.commit_window = Config.DB_COMMIT_WINDOW if commit_window is None else commit_window
+        self.commit_batch = commit_batch or Config.DB_COMMIT_BATCH
+        self._batch = []
+        self._commit_timer = None
+        self.commit_batches = 0
+        self.committed_writes = 0
+        
+        # One reader connection per read worker, so a worker never waits for one
+        self._readers = queue.Queue()
+        for _ in range(readers):
+            reader = Database(db_name, read_only=True)
+            reader.conn.execute('PRAGMA busy_timeout=5000')
+            self._readers.put(reader)
+        self._read_executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader')
+        
+        # Optional per-handler SQL tracing on every connection
+        self.tracer = sql_trace.SQLTracer() if Config.SQL_TRACE else None
+        if self.tracer:
+            self.writer.enable_tracing(self.tracer)
+            for reader in list(self._readers.queue):
+                reader.enable_tracing(self.tracer)
+        
+        # Banned ids, loaded once and kept in sync by set_user_banned
+        self.banned_users = set()
+        
+        # Admin ids (Config.ADMIN_IDS plus the admins table), loaded on first use
+        self.admin_ids = None
+        
+        # Balance/invite profiles, invalidated by the write paths below
+        self.profiles = ProfileCache()
+    
+    async def _read(self, name, /, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            # Run in a copy of the caller's context so SQL tracing can attribute statements
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._read_executor, context.run, self._call_reader, name, args, kwargs)
+        except Exception:
+            metrics.registry.inc('smm_db_errors_total', (('method', name),))
+            raise
+        finally:
+            metrics.registry.observe('smm_db_seconds', (('method', name),), time.perf_counter() - started)
+    
+    def _call_reader(self, name, args, kwargs):
+        reader = self._readers.get()
+        try:
+            return getattr(reader, name)(*args, **kwargs)
+        finally:
+            self._readers.put(reader)
+    
+    async def _write(self, name, /, *args, **kwargs):
+        # Timed until the write is committed, group-commit wait included
+        started = time.perf_counter()
+        try:
+            return await self._apply_write(name, args, kwargs)
+        except Exception:
+            metrics.registry.inc('smm_db_errors_total', (('method', name),))
+            raise
+        finally:
+            metrics.registry.observe('smm_db_seconds', (('method', name),), time.perf_counter() - started)
+    
+    async def _apply_write(self, name, args, kwargs):
+        loop = asyncio.get_running_loop()
+        call = partial(contextvars.copy_context().run, getattr(self.writer, name), *args, **kwargs)
+        if self.commit_window <= 0:
+            return await loop.run_in_executor(self._write_executor, call)
+        
+        # Resolves once the batch holding this write has committed
+        future = loop.create_future()
+        self._batch.append((call, future, time.monotonic()))
+        if len(self._batch) >= self.commit_batch:
+            self._flush_batch()
+        elif self._commit_timer is None:
+            self._commit_timer = loop.call_later(self.commit_window, self._flush_batch)
+        return await future
+    
+    def _flush_batch(self):
+        if self._commit_timer is not None:
+            self._commit_timer.cancel()
+            self._commit_timer = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        
+        # The single writer thread runs batches in order, so writes made while
+        # one batch commits simply gather into the next
+        calls = [call for call, _, _ in batch]
+        loop = asyncio.get_running_loop()
+        done = loop.run_in_executor(self._write_executor, self._commit_batch, calls)
+        done.add_done_callback(lambda finished: self._resolve_batch(batch, finished))
+    
+    def _commit_batch(self, calls):
+        started = time.perf_counter()
+        outcomes = self.writer.run_batch(calls)
+        return outcomes, time.perf_counter() - started
+    
+    def _resolve_batch(self, batch, finished):
+        if finished.exception() is not None:
+            # The commit itself failed, so none of the writes are durable
+            outcomes = [(False, finished.exception())] * len(batch)
+        else:
+            outcomes, elapsed = finished.result()
+            self.commit_batches += 1
+            self.committed_writes += len(batch)
+            metrics.registry.observe('smm_db_commit_batch_size', (), len(batch))
+            metrics.registry.observe('smm_db_commit_seconds', (), elapsed)
+        self._settle(batch, outcomes)
+    
+    def _settle(self, batch, outcomes):
+        now = time.monotonic()
+        for (_, future, queued_at), (ok, value) in zip(batch, outcomes):
+            metrics.registry.observe('smm_db_commit_wait_seconds', (), now - queued_at)
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+    
+    async def run_maintenance(self):
+        # Straight on the writer thread: VACUUM and checkpoints cannot run
+        # inside a group-commit transaction
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._write_executor, self.writer.run_maintenance)
+    
+    # Settings are cached in memory and never touch the disk on read
+    @property
+    def settings_version(self):
+        return self.writer.settings_version
+    
+    @property
+    def services_version(self):
+        return self.writer.services_version
+    
+    def get_setting(self, key, default=None):
+        return self.writer.get_setting(key, default)
+    
+    def get_settings(self, keys):
+        return self.writer.get_settings(keys)
+    
+    def settings_cache_stats(self):
+        return self.writer.settings_cache_stats()
+    
+    async def invalidate_settings(self):
+        def reload():
+            self.writer.invalidate_settings()
+            self.writer.load_settings()
+        
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._write_executor, reload)
+    
+    async def load_banned_users(self):
+        self.banned_users = set(await self.get_banned_user_ids())
+        return len(self.banned_users)
+    
+    def is_banned(self, user_id):
+        return user_id in self.banned_users
+    
+    async def set_user_banned(self, user_id, banned=True):
+        updated = await self._write('set_user_banned', user_id, banned)
+        if updated and banned:
+            self.banned_users.add(user_id)
+        elif updated:
+            self.banned_users.discard(user_id)
+        return updated
+    
+    async def load_admins(self):
+        self.admin_ids = await self._read('get_admins')
+        return len(self.admin_ids)
+    
+    async def get_admins(self):
+        if self.admin_ids is None:
+            await self.load_admins()
+        return self.admin_ids
+    
+    async def is_admin(self, user_id):
+        return user_id in await self.get_admins()
+    
+    async def get_user_account(self, user_id):
+        profile = self.profiles.get(user_id)
+        if profile is None:
+            version = self.profiles.begin_load(user_id)
+            try:
+                row = await self._read('get_user_account', user_id)
+                profile = UserProfile(user_id, *row) if row else UserProfile(user_id)
+            finally:
+                self.profiles.put(user_id, profile, version)
+        return profile
+    
+    async def get_referral_earnings(self, user_id):
+        profile = await self.get_user_account(user_id)
+        return profile.referral_earnings(float(self.get_setting('invite_bonus', '0')))
+    
+    # Writes that change balances or counters drop the affected profiles
+    async def register_user(self, user_id, username, first_name, last_name, referral_by=None):
+        registered = await self._write('register_user', user_id, username, first_name, last_name, referral_by)
+        self.profiles.invalidate(user_id)
+        return registered
+    
+    async def update_user_balance(self, user_id, amount):
+        await self._write('update_user_balance', user_id, amount)
+        self.profiles.invalidate(user_id)
+    
+    async def create_order(self, user_id, service_id, link, quantity, total_price):
+        order_id = await self._write('create_order', user_id, service_id, link, quantity, total_price)
+        self.profiles.invalidate(user_id)
+        return order_id
+    
+    async def place_order(self, user_id, service_id, link, quantity, total_price):
+        order_id = await self._write('place_order', user_id, service_id, link, quantity, total_price)
+        self.profiles.invalidate(user_id)
+        return order_id
+    
+    async def place_orders(self, orders):
+        order_ids = await self._write('place_orders', orders)
+        self.profiles.invalidate(*(order[0] for order in orders))
+        return order_ids
+    
+    async def review_deposits(self, first_id, last_id, admin_id, approve):
+        reviewed = await self._write('review_deposits', first_id, last_id, admin_id, approve)
+        self.profiles.invalidate(*(user_id for _, user_id, _, _ in reviewed))
+        return reviewed
+    
+    async def approve_deposit(self, deposit_id, admin_id):
+        return bool(await self.review_deposits(deposit_id, deposit_id, admin_id, True))
+    
+    def close(self):
+        self._read_executor.shutdown(wait=True)
+        self._write_executor.shutdown(wait=True)
+        
+        # Commit writes still waiting for their window
+        if self._commit_timer is not None:
+            self._commit_timer.cancel()
+            self._commit_timer = None
+        if self._batch:
+            batch, self._batch = self._batch, []
+            try:
+                outcomes = self.writer.run_batch([call for call, _, _ in batch])
+            except Exception as e:
+                outcomes = [(False, e)] * len(batch)
+            self._settle(batch, outcomes)
+        while not self._readers.empty():
+            self._readers.get().conn.close()
+        self.writer.conn.close()
+
+def _reader_method(name):
+    async def method(self, /, *args, **kwargs):
+        return await self._read(name, *args, **kwargs)
+    method.__name__ = name
+    return method
+
+def _writer_method(name):
+    async def method(self, /, *args, **kwargs):
+        return await self._write(name, *args, **kwargs)
+    method.__name__ = name
+    return method
+
+for _name in READ_METHODS:
+    setattr(AsyncDatabase, _name, _reader_method(_name))
+
+for _name in WRITE_METHODS:
+    setattr(AsyncDatabase, _name, _writer_method(_name))
@@ -0,0 +1,114 @@
+# auto_delete.py
+import asyncio
+import heapq
+import logging
+import time
+from telegram.error import RetryAfter, TelegramError
+from broadcast import RateLimiter
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class AutoDeleter:
+    # Deletes tracked bot messages after Config.AUTO_DELETE seconds. All
+    # pending deletions sit in one heap ordered by due time and a single
+    # worker deletes whatever is due in rate-limited batches. New entries
+    # and completed deletions are written to the database in batches, so
+    # the schedule survives a restart without a write per message.
+    def __init__(self, bot, db, delay=None, rate=None, batch_size=100, tick=1.0, limiter=None):
+        self.bot = bot
+        self.db = db
+        self.delay = Config.AUTO_DELETE if delay is None else delay
+        self.limiter = limiter or RateLimiter(rate or Config.BROADCAST_RATE)
+        self.batch_size = batch_size
+        self.tick = tick
+        self.heap = []
+        self._to_save = []
+        self._to_forget = []
+        self._wake = asyncio.Event()
+        self._worker = None
+        self.deleted = 0
+        self.failed = 0
+    
+    @property
+    def enabled(self):
+        return self.delay > 0
+    
+    def track(self, message, delay=None):
+        # Messages with buttons are navigated by editing them in place, so
+        # deleting one would pull the screen out from under the user
+        if not self.enabled or message is None or message.reply_markup:
+            return message
+        
+        entry = (time.time() + (delay or self.delay), message.chat_id, message.message_id)
+        heapq.heappush(self.heap, entry)
+        self._to_save.append(entry)
+        if self.heap[0] is entry:
+            self._wake.set()
+        return message
+    
+    async def load(self):
+        # Pick up deletions scheduled before the last restart
+        rows = await self.db.get_scheduled_deletions()
+        for due_at, chat_id, message_id in rows:
+            heapq.heappush(self.heap, (due_at, chat_id, message_id))
+        return len(rows)
+    
+    def start(self):
+        if self.enabled and self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        await self._persist()
+    
+    async def _run(self):
+        while True:
+            timeout = self.tick
+            if self.heap:
+                timeout = min(timeout, max(self.heap[0][0] - time.time(), 0))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            
+            try:
+                await self._delete_due()
+                await self._persist()
+            except Exception:
+                logger.exception("Auto-delete batch failed")
+    
+    async def _delete_due(self):
+        now = time.time()
+        batch = []
+        while self.heap and self.heap[0][0] <= now and len(batch) < self.batch_size:
+            batch.append(heapq.heappop(self.heap))
+        if batch:
+            await asyncio.gather(*(self._delete(entry) for entry in batch))
+    
+    async def _delete(self, entry):
+        _, chat_id, message_id = entry
+        await self.limiter.wait()
+        try:
+            await self.bot.delete_message(chat_id, message_id)
+            self.deleted += 1
+        except RetryAfter as e:
+            self.limiter.pause(e.retry_after)
+            heapq.heappush(self.heap, (time.time() + e.retry_after, chat_id, message_id))
+            return
+        except TelegramError:
+            # Already deleted by the user, or too old for the bot to delete
+            self.failed += 1
+        self._to_forget.append((chat_id, message_id))
+    
+    async def _persist(self):
+        if self._to_save:
+            rows, self._to_save = self._to_save, []
+            await self.db.add_scheduled_deletions(rows)
+        if self._to_forget:
+            rows, self._to_forget = self._to_forget, []
+            await self.db.remove_scheduled_deletions(rows)
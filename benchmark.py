@@ -0,0 +1,432 @@
+# benchmark.py
+# Replays synthetic update streams through SMMBot's real handlers against a
+# local stand-in for the Bot API (no network) and reports per-handler
+# latency, updates per second, SQL statements per update and peak memory.
+#
+#   python benchmark.py                    run all scenarios, compare with the baseline
+#   python benchmark.py --save-baseline    store this run as the new baseline
+#   python benchmark.py --users 2000 --scenarios start_storm browse
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+ADMIN_ID = 1
+BOT_USER = {'id': 4242, 'is_bot': True, 'first_name': 'SMM Bench', 'username': 'smm_bench_bot'}
+SCENARIOS = ('start_storm', 'browse', 'order', 'deposit', 'broadcast')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+def configure(args):
+    # Config reads the environment at import, so this runs before bot is imported.
+    # The anti-spam limiter is off so every synthetic update reaches the handlers.
+    workdir = tempfile.mkdtemp(prefix='smm-bench-')
+    os.environ.update({
+        'DATABASE_PATH': os.path.join(workdir, 'bench.db'),
+        'ADMIN_IDS': str(ADMIN_ID),
+        'ANTI_SPAM_DELAY': '0',
+        'BROADCAST_RATE': str(args.broadcast_rate),
+        'MAINTENANCE_HOUR': '-1',
+        'METRICS_PORT': '0',
+        'RUN_MODE': 'polling'
+    })
+    if args.storage_profile:
+        os.environ['STORAGE_PROFILE'] = args.storage_profile
+    return workdir
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def latency_summary(samples):
+    return {
+        'count': len(samples),
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000
+    }
+
+class SQLCounter:
+    # sqlite3 trace callback; counts every statement the connections run and
+    # hands it on to the SQL_TRACE tracer when that is enabled
+    def __init__(self, tracer=None):
+        self.count = 0
+        self.tracer = tracer
+    
+    def __call__(self, statement):
+        self.count += 1
+        if self.tracer is not None:
+            self.tracer.on_statement(statement)
+    
+    def install(self, db):
+        db.writer.conn.set_trace_callback(self)
+        for reader in list(db._readers.queue):
+            reader.conn.set_trace_callback(self)
+
+def make_fake_request():
+    from telegram.request import BaseRequest
+    
+    class FakeBotAPI(BaseRequest):
+        # Answers Bot API calls locally with just enough of a result for PTB
+        # to build its objects; `latency` simulates the network round trip
+        def __init__(self, latency=0.0):
+            self.latency = latency
+            self.calls = Counter()
+            self._message_id = 0
+        
+        async def initialize(self):
+            pass
+        
+        async def shutdown(self):
+            pass
+        
+        async def do_request(self, url, method, request_data=None, read_timeout=None,
+                             write_timeout=None, connect_timeout=None, pool_timeout=None):
+            api_method = url.rsplit('/', 1)[-1]
+            self.calls[api_method] += 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            params = request_data.parameters if request_data else {}
+            return 200, json.dumps({'ok': True, 'result': self._result(api_method, params)}).encode()
+        
+        def _result(self, api_method, params):
+            if api_method == 'getMe':
+                return BOT_USER
+            if api_method == 'getChatMember':
+                user = {'id': params['user_id'], 'is_bot': False, 'first_name': 'User'}
+                return {'status': 'member', 'user': user}
+            if api_method == 'copyMessage':
+                self._message_id += 1
+                return {'message_id': self._message_id}
+            if api_method in ('sendMessage', 'forwardMessage', 'editMessageText'):
+                return self._message(params)
+            return True
+        
+        def _message(self, params):
+            if 'message_id' in params:
+                message_id = params['message_id']
+            else:
+                self._message_id += 1
+                message_id = self._message_id
+            return {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': params.get('chat_id', 0), 'type': 'private'},
+                'from': BOT_USER,
+                'text': params.get('text', '')
+            }
+    
+    return FakeBotAPI
+
+class UpdateFactory:
+    def __init__(self, bot):
+        self.bot = bot
+        self.update_id = 0
+    
+    def _user(self, user_id):
+        return {'id': user_id, 'is_bot': False, 'first_name': f"User{user_id}", 'username': f"user{user_id}"}
+    
+    def _next_id(self):
+        self.update_id += 1
+        return self.update_id
+    
+    def message(self, user_id, text):
+        from telegram import Update
+        update_id = self._next_id()
+        message = {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': self._user(user_id),
+            'text': text
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return Update.de_json({'update_id': update_id, 'message': message}, self.bot)
+    
+    def callback(self, user_id, data):
+        from telegram import Update
+        update_id = self._next_id()
+        query = {
+            'id': str(update_id),
+            'from': self._user(user_id),
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': BOT_USER,
+                'text': 'menu'
+            }
+        }
+        return Update.de_json({'update_id': update_id, 'callback_query': query}, self.bot)
+
+def interleave(streams):
+    # Round-robin across users: concurrent users, each user's updates in order
+    updates = []
+    for step in range(max((len(stream) for stream in streams), default=0)):
+        updates.extend(stream[step] for stream in streams if step < len(stream))
+    return updates
+
+class Benchmark:
+    def __init__(self, args):
+        import bot as bot_module
+        
+        self.args = args
+        self.bot_module = bot_module
+        self.db = bot_module.db
+        self.api = make_fake_request()(args.api_latency / 1000)
+        self.smm = bot_module.SMMBot('123456:BENCH', request=self.api)
+        self.app = self.smm.application
+        self.factory = UpdateFactory(self.app.bot)
+        self.sql = SQLCounter(self.db.tracer)
+        self.handler_samples = defaultdict(list)
+        self.user_ids = list(range(1000, 1000 + args.users))
+        self.service_ids = []
+        self.categories = []
+        self._instrument()
+    
+    def _instrument(self):
+        # Wrap every handler callback, including the conversation states, with a timer
+        import metrics
+        
+        def wrap(handler):
+            callback = handler.callback
+            name = getattr(callback, '__name__', repr(callback))
+            samples = self.handler_samples[name]
+            
+            async def timed(update, context):
+                started = time.perf_counter()
+                try:
+                    return await callback(update, context)
+                finally:
+                    samples.append(time.perf_counter() - started)
+            
+            handler.callback = timed
+        
+        for handler in metrics.iter_handlers(self.app):
+            wrap(handler)
+    
+    async def setup(self):
+        await self.app.initialize()
+        await self.smm.post_init(self.app)
+        await self.app.start()
+        self.sql.install(self.db)
+        
+        # A catalog big enough to paginate: 6 categories of 15 services
+        for category_index in range(6):
+            category = f"Category{category_index}"
+            self.categories.append(category)
+            for service_index in range(15):
+                service_id = await self.db.add_service(
+                    category, f"Service {category_index}-{service_index}", "Bench service",
+                    1 + service_index, 100, 100000
+                )
+                self.service_ids.append(service_id)
+    
+    async def teardown(self):
+        await self.app.stop()
+        await self.smm.post_stop(self.app)
+        await self.app.shutdown()
+        await self.smm.shutdown(self.app)
+    
+    async def _process(self, update, samples):
+        processor = self.app.update_processor
+        started = time.perf_counter()
+        await processor.process_update(update, self.app.process_update(update))
+        samples.append(time.perf_counter() - started)
+    
+    async def _background_idle(self):
+        # Broadcast jobs and user notifications run after their update returns
+        while self.smm.broadcaster.tasks:
+            await asyncio.gather(*list(self.smm.broadcaster.tasks.values()), return_exceptions=True)
+    
+    async def run_scenario(self, name):
+        updates = await getattr(self, f"build_{name}")()
+        for samples in self.handler_samples.values():
+            samples.clear()
+        api_before = Counter(self.api.calls)
+        sql_before = self.sql.count
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        
+        samples = []
+        started = time.perf_counter()
+        await asyncio.gather(*(self._process(update, samples) for update in updates))
+        await self._background_idle()
+        elapsed = time.perf_counter() - started
+        
+        api_calls = self.api.calls - api_before
+        result = {
+            'updates': len(updates),
+            'seconds': elapsed,
+            'updates_per_sec': len(updates) / elapsed if elapsed else 0.0,
+            'latency': latency_summary(samples),
+            'sql_per_update': (self.sql.count - sql_before) / max(len(updates), 1),
+            'api_calls': dict(api_calls),
+            'handlers': {
+                handler: latency_summary(handler_samples)
+                for handler, handler_samples in self.handler_samples.items() if handler_samples
+            }
+        }
+        if tracemalloc.is_tracing():
+            result['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        return result
+    
+    # Update streams
+    async def build_start_storm(self):
+        # Every user sends /start at once
+        streams = [[self.factory.message(user_id, '/start')] for user_id in self.user_ids]
+        return interleave(streams)
+    
+    async def build_browse(self):
+        streams = []
+        for index, user_id in enumerate(self.user_ids):
+            category = self.categories[index % len(self.categories)]
+            streams.append([
+                self.factory.callback(user_id, 'services'),
+                self.factory.callback(user_id, f"category_{category}"),
+                self.factory.callback(user_id, f"category_{category}|2"),
+                self.factory.callback(user_id, 'balance'),
+                self.factory.callback(user_id, 'invite'),
+                self.factory.callback(user_id, 'main_menu')
+            ])
+        return interleave(streams)
+    
+    async def build_order(self):
+        for user_id in self.user_ids:
+            await self.db.update_user_balance(user_id, 1000)
+        streams = []
+        for index, user_id in enumerate(self.user_ids):
+            service_id = self.service_ids[index % len(self.service_ids)]
+            streams.append([
+                self.factory.callback(user_id, f"service_{service_id}"),
+                self.factory.message(user_id, f"https://t.me/channel{user_id}"),
+                self.factory.message(user_id, '1000')
+            ])
+        return interleave(streams)
+    
+    async def build_deposit(self):
+        streams = []
+        for user_id in self.user_ids:
+            streams.append([
+                self.factory.callback(user_id, 'deposit'),
+                self.factory.message(user_id, '100'),
+                self.factory.message(user_id, f"TRX{user_id}-{self.factory.update_id}")
+            ])
+        return interleave(streams)
+    
+    async def build_broadcast(self):
+        # One admin broadcast to every registered user; the run ends when the job does
+        return [
+            self.factory.callback(ADMIN_ID, 'broadcast_all'),
+            self.factory.message(ADMIN_ID, 'Benchmark broadcast')
+        ]
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def change(current, previous):
+    if not previous:
+        return ''
+    return f" ({(current - previous) / previous * 100:+.1f}%)"
+
+def print_report(report, baseline):
+    base = (baseline or {}).get('scenarios', {})
+    for name, result in report['scenarios'].items():
+        old = base.get(name, {})
+        latency = result['latency']
+        old_latency = old.get('latency', {})
+        print(f"\n== {name}: {result['updates']} updates in {result['seconds']:.2f}s")
+        print(f"   updates/s   {result['updates_per_sec']:10.1f}{change(result['updates_per_sec'], old.get('updates_per_sec'))}")
+        print(f"   p50/p95/p99 {latency['p50_ms']:.2f} / {latency['p95_ms']:.2f} / {latency['p99_ms']:.2f} ms"
+              f"{change(latency['p95_ms'], old_latency.get('p95_ms'))} (p95)")
+        print(f"   SQL/update  {result['sql_per_update']:10.2f}{change(result['sql_per_update'], old.get('sql_per_update'))}")
+        if 'peak_traced_mb' in result:
+            print(f"   peak traced {result['peak_traced_mb']:10.1f} MB")
+        print(f"   API calls   {', '.join(f'{method}={count}' for method, count in sorted(result['api_calls'].items()))}")
+        for handler, stats in sorted(result['handlers'].items()):
+            print(f"     {handler:<24} n={stats['count']:<6} p50={stats['p50_ms']:.2f} p95={stats['p95_ms']:.2f} p99={stats['p99_ms']:.2f} ms")
+    
+    print(f"\nPeak RSS: {report['peak_rss_mb']:.1f} MB")
+    if baseline:
+        print(f"Compared with baseline from {baseline.get('created', 'unknown')} ({baseline.get('commit') or 'no commit'})")
+
+def current_commit():
+    try:
+        import subprocess
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+async def run(args):
+    bench = Benchmark(args)
+    await bench.setup()
+    scenarios = {}
+    try:
+        # start_storm always runs: it registers the users the other scenarios act as
+        for name in SCENARIOS:
+            if name == 'start_storm' or name in args.scenarios:
+                scenarios[name] = await bench.run_scenario(name)
+    finally:
+        await bench.teardown()
+    
+    for name in list(scenarios):
+        if name not in args.scenarios:
+            del scenarios[name]
+    return scenarios
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SMMBot handlers against a fake Bot API")
+    parser.add_argument('--users', type=int, default=500, help="synthetic users per scenario")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--api-latency', type=float, default=0.0, help="simulated Bot API round trip in ms")
+    parser.add_argument('--broadcast-rate', type=int, default=100000, help="BROADCAST_RATE for the run")
+    parser.add_argument('--storage-profile', help="STORAGE_PROFILE for the run")
+    parser.add_argument('--trace-memory', action='store_true', help="track peak Python allocations (slower)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the baseline")
+    parser.add_argument('--output', help="also write the results as JSON to this file")
+    args = parser.parse_args()
+    
+    configure(args)
+    if args.trace_memory:
+        tracemalloc.start()
+    
+    scenarios = asyncio.run(run(args))
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': current_commit(),
+        'python': sys.version.split()[0],
+        'users': args.users,
+        'api_latency_ms': args.api_latency,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'scenarios': scenarios
+    }
+    
+    print_report(report, None if args.save_baseline else load_baseline(args.baseline))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+if __name__ == "__main__":
+    main()
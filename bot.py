@@ -1,17 +1,33 @@
 # bot.py
 import logging
 import asyncio
+import time
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, CallbackQueryHandler, 
-    MessageHandler, filters, ContextTypes, ConversationHandler
+    MessageHandler, filters, ContextTypes, ConversationHandler,
+    TypeHandler, ApplicationHandlerStop
 )
 from telegram.constants import ParseMode
-import database
+from telegram.helpers import escape_markdown
+from telegram.request import HTTPXRequest
+import async_database
 import keyboards
 import admin_tools
-import services
+import broadcast
+import notifications
+import user_cache
+import membership
+import catalog
+import update_processor
+import rate_limit
+import auto_delete
+import persistence
+import maintenance
+import metrics
+import sql_trace
+from config import Config
 
 # Enable logging
 logging.basicConfig(
@@ -20,26 +36,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize database
-db = database.Database()
+# Count logged errors, including ones that are handled and swallowed
+logging.getLogger().addHandler(metrics.ErrorCounter())
+
+# Initialize database (queries run off the event loop)
+db = async_database.AsyncDatabase(Config.DATABASE_PATH)
+
+# Only the update types our handlers consume
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
 
 # States for conversation
 DEPOSIT_AMOUNT, DEPOSIT_TRX_ID, ORDER_LINK, ORDER_QUANTITY = range(4)
 
 class SMMBot:
-    def __init__(self, token):
-        self.application = Application.builder().token(token).build()
+    def __init__(self, token, request=None):
+        builder = (
+            Application.builder()
+            .token(token)
+            .concurrent_updates(update_processor.PerUserUpdateProcessor(Config.CONCURRENT_UPDATES))
+            .persistence(persistence.SQLitePersistence(db))
+            .post_init(self.post_init)
+            .post_stop(self.post_stop)
+            .post_shutdown(self.shutdown)
+        )
+        # Every Bot API call is counted and timed; a custom request lets tools
+        # such as benchmark.py talk to a local stand-in Bot API
+        builder = builder.request(metrics.InstrumentedRequest(request or HTTPXRequest(connection_pool_size=256)))
+        self.application = builder.build()
+        # One send budget for broadcasts, user notices and auto-deletes, so
+        # together they stay under Telegram's global limit
+        self.send_limiter = broadcast.RateLimiter(Config.BROADCAST_RATE)
+        self.broadcaster = broadcast.BroadcastEngine(self.application.bot, db, limiter=self.send_limiter)
+        self.application.bot_data['broadcaster'] = self.broadcaster
+        self.notifier = notifications.AdminNotifier(self.application.bot, db)
+        self.user_notifier = notifications.UserNotifier(self.application.bot, limiter=self.send_limiter)
+        self.application.bot_data['user_notifier'] = self.user_notifier
+        self.seen_users = user_cache.SeenUsers(db)
+        self.membership = membership.MembershipChecker(self.application.bot)
+        self.catalog = catalog.ServiceCatalog(db)
+        self.bot_username = None
+        self.auto_delete = auto_delete.AutoDeleter(self.application.bot, db, limiter=self.send_limiter)
+        self.rate_limiter = rate_limit.TokenBucketLimiter(Config.ANTI_SPAM_DELAY, Config.ANTI_SPAM_BURST)
+        self.maintenance = maintenance.DatabaseMaintenance(db, self.notifier.notify)
+        self.metrics_server = metrics.MetricsServer(Config.METRICS_LISTEN, Config.METRICS_PORT)
         self.setup_handlers()
+        self.setup_metrics()
     
     def setup_handlers(self):
-        # Command handlers
-        self.application.add_handler(CommandHandler("start", self.start))
-        self.application.add_handler(CommandHandler("admin", self.admin_panel))
+        # Drop updates from banned users before any other handler runs
+        self.application.add_handler(TypeHandler(Update, self.check_banned), group=-2)
         
-        # Callback query handlers
-        self.application.add_handler(CallbackQueryHandler(self.button_handler))
+        # Then drop updates from users clicking faster than ANTI_SPAM_DELAY allows
+        self.application.add_handler(TypeHandler(Update, self.check_rate_limit), group=-1)
         
-        # Conversation handlers
+        # Conversation handlers (registered before the command and generic
+        # callback handlers so the deposit and order buttons enter the
+        # conversation and /start can end it). States and user_data are
+        # persisted, so a restart does not drop half-finished flows; re-entry,
+        # /start, any other button and the timeout let users leave one.
         conv_handler = ConversationHandler(
             entry_points=[
                 CallbackQueryHandler(self.start_deposit, pattern='^deposit$'),
@@ -51,72 +105,161 @@ class SMMBot:
                 ORDER_LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.get_order_link)],
                 ORDER_QUANTITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.get_order_quantity)]
             },
-            fallbacks=[CommandHandler("cancel", self.cancel_conversation)]
+            fallbacks=[
+                CommandHandler("cancel", self.cancel_conversation),
+                CommandHandler("start", self.restart_conversation),
+                CallbackQueryHandler(self.leave_conversation)
+            ],
+            allow_reentry=True,
+            # Ends idle flows through the JobQueue (python-telegram-bot[job-queue])
+            conversation_timeout=Config.CONVERSATION_TIMEOUT,
+            name='smm_conversation',
+            persistent=True
         )
         self.application.add_handler(conv_handler)
         
+        # Command handlers
+        self.application.add_handler(CommandHandler("start", self.start))
+        self.application.add_handler(CommandHandler("admin", self.admin_panel))
+        self.application.add_handler(CommandHandler("find", self.find_service))
+        self.application.add_handler(CommandHandler("metrics", self.show_metrics))
+        
+        # Callback query handlers
+        self.application.add_handler(CallbackQueryHandler(self.button_handler))
+        
         # Message handler for admin broadcast
         self.application.add_handler(MessageHandler(
             filters.TEXT & filters.ChatType.PRIVATE, 
             self.handle_message
         ))
     
-    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    def setup_metrics(self):
+        # Time every handler callback, then expose the live queues as gauges
+        metrics.instrument_handlers(self.application)
+        if db.tracer:
+            sql_trace.trace_handlers(self.application, db.tracer)
+        
+        processor = self.application.update_processor
+        gauges = (
+            ('smm_update_queue_depth', "Updates queued or running", lambda: self.queue_depth),
+            ('smm_updates_running', "Updates running", lambda: processor.running),
+            ('smm_busy_users', "Users with updates in flight", lambda: processor.busy_users),
+            ('smm_admin_notifications_queued', "Admin notifications queued", lambda: self.notifier.queue.qsize()),
+            ('smm_auto_delete_pending', "Messages waiting for auto-delete", lambda: len(self.auto_delete.heap)),
+            ('smm_broadcasts_running', "Broadcasts running", lambda: len(self.broadcaster.tasks)),
+            ('smm_db_commit_batches', "DB group commits", lambda: db.commit_batches),
+            ('smm_db_committed_writes', "DB writes committed", lambda: db.committed_writes),
+            ('smm_db_write_queue', "DB writes waiting for commit", lambda: len(db._batch)),
+            ('smm_profile_cache_hits', "Profile cache hits", lambda: db.profiles.hits),
+            ('smm_profile_cache_misses', "Profile cache misses", lambda: db.profiles.misses)
+        )
+        if db.tracer:
+            gauges += (
+                ('smm_sql_background_statements', "SQL statements outside handlers", lambda: db.tracer.background_statements),
+                ('smm_sql_background_slow', "Slow SQL statements outside handlers", lambda: db.tracer.background_slow)
+            )
+        for name, help_text, read in gauges:
+            metrics.registry.gauge(name, help_text, read)
+    
+    async def check_banned(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
-        chat_id = update.effective_chat.id
+        if user is None or not db.is_banned(user.id):
+            return
         
-        # Check if user is banned
-        if db.is_user_banned(user.id):
-            await update.message.reply_text("🚫 You are banned from using this bot.")
+        if update.callback_query:
+            await update.callback_query.answer("🚫 You are banned from using this bot.", show_alert=True)
+        elif update.message and update.message.text and update.message.text.startswith('/start'):
+            self.auto_delete.track(await update.message.reply_text("🚫 You are banned from using this bot."))
+        raise ApplicationHandlerStop
+    
+    async def check_rate_limit(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        if user is None or await db.is_admin(user.id) or self.rate_limiter.allow(user.id):
             return
         
-        # Register user if not exists
-        db.register_user(
-            user.id,
-            user.username,
-            user.first_name,
-            user.last_name
-        )
+        if update.callback_query:
+            # Unanswered queries keep the button spinning
+            await update.callback_query.answer("⏳ Slow down, please.")
+        raise ApplicationHandlerStop
+    
+    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        chat_id = update.effective_chat.id
+        
+        # Register user if not exists (known users cost no write)
+        await self.seen_users.touch(user)
         
         # Check group join requirement
-        group_check = db.get_setting('group_check')
-        if group_check == '1':
-            group_link = db.get_setting('group_link')
-            group_message = db.get_setting('group_message')
-            verify_button = db.get_setting('verify_button')
-            
-            # Check if user is in group
-            if not await self.check_group_membership(update, context, group_link):
-                keyboard = [[InlineKeyboardButton(verify_button, callback_data='check_join')]]
-                await update.message.reply_text(
-                    group_message,
-                    reply_markup=InlineKeyboardMarkup(keyboard)
-                )
-                return
+        if not await self.check_group_membership(update, context):
+            await update.message.reply_text(
+                db.get_setting('group_message'),
+                reply_markup=self.join_group_keyboard()
+            )
+            return
         
         # Send welcome message
-        welcome_msg = db.get_setting('welcome_message')
-        bot_name = db.get_setting('bot_name')
+        settings = db.get_settings(['welcome_message', 'bot_name'])
+        welcome_msg = settings['welcome_message']
+        bot_name = settings['bot_name']
         
         # Create main menu keyboard
         keyboard = keyboards.main_menu(db)
         
+        # Not auto-deleted: every menu screen is an edit of this message
         await update.message.reply_text(
             f"👋 Welcome to *{bot_name}*\n\n{welcome_msg}",
             reply_markup=keyboard,
             parse_mode=ParseMode.MARKDOWN
         )
     
-    async def check_group_membership(self, update: Update, context: ContextTypes.DEFAULT_TYPE, group_link: str):
-        # Extract group ID from link
-        try:
-            # This is a simplified check. In production, you'd use Telegram API to check membership
-            # For now, we'll just check against a cached list
-            user_id = update.effective_user.id
-            # Implement actual group check here
-            return True  # Placeholder
-        except:
-            return False
+    async def check_group_membership(self, update: Update, context: ContextTypes.DEFAULT_TYPE, force=False):
+        settings = db.get_settings(['group_check', 'group_id', 'group_link'])
+        if settings['group_check'] != '1':
+            return True
+        
+        chat_id = membership.group_chat_id(settings['group_id'], settings['group_link'])
+        if chat_id is None:
+            return True
+        
+        user_id = update.effective_user.id
+        if user_id in Config.ADMIN_IDS:
+            return True
+        return await self.membership.is_member(chat_id, user_id, force=force)
+    
+    async def pass_join_gate(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # Join gate (cached, so it rarely costs an API call)
+        if await self.check_group_membership(update, context):
+            return True
+        await update.callback_query.edit_message_text(
+            db.get_setting('group_message'),
+            reply_markup=self.join_group_keyboard()
+        )
+        return False
+    
+    def join_group_keyboard(self):
+        keyboard = [[InlineKeyboardButton(db.get_setting('verify_button'), callback_data='check_join')]]
+        return InlineKeyboardMarkup(keyboard)
+    
+    async def verify_group_join(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = update.callback_query
+        
+        # The user just pressed "I have joined", so skip the cache
+        if await self.check_group_membership(update, context, force=True):
+            await self.show_main_menu(query)
+            return
+        
+        await query.edit_message_text(
+            f"❌ You haven't joined yet.\n\n{db.get_setting('group_message')}",
+            reply_markup=self.join_group_keyboard()
+        )
+    
+    async def show_main_menu(self, query):
+        settings = db.get_settings(['welcome_message', 'bot_name'])
+        await query.edit_message_text(
+            f"👋 Welcome to *{settings['bot_name']}*\n\n{settings['welcome_message']}",
+            reply_markup=keyboards.main_menu(db),
+            parse_mode=ParseMode.MARKDOWN
+        )
     
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
@@ -125,20 +268,23 @@ class SMMBot:
         
         user_id = query.from_user.id
         
-        # Check if user is banned
-        if db.is_user_banned(user_id):
-            await query.edit_message_text("🚫 You are banned from using this bot.")
+        if data == 'check_join':
+            await self.verify_group_join(update, context)
+            return
+        if not await self.pass_join_gate(update, context):
             return
         
         # Handle different button clicks
-        if data == 'balance':
+        if data == 'main_menu':
+            await self.show_main_menu(query)
+        elif data == 'balance':
             await self.show_balance(query)
         elif data == 'services':
             await self.show_services(query)
+        elif data.startswith('services_'):
+            await self.show_services(query, int(data.split('_')[1]))
         elif data == 'prices':
             await self.show_prices(query)
-        elif data == 'deposit':
-            await self.start_deposit(update, context)
         elif data == 'invite':
             await self.show_invite(query)
         elif data == 'support':
@@ -146,25 +292,22 @@ class SMMBot:
         elif data == 'stats':
             await self.show_statistics(query)
         elif data.startswith('category_'):
-            await self.show_category_services(query, data.split('_')[1])
-        elif data.startswith('service_'):
-            await self.start_order(update, context)
-        elif data == 'check_join':
-            await self.verify_group_join(query, context)
+            # category_<name> or category_<name>|<page>
+            category, _, page = data[len('category_'):].partition('|')
+            await self.show_category_services(query, category, int(page or 1))
         elif data == 'admin_edit_welcome':
             await self.admin_edit_welcome(query)
-        elif data.startswith('admin_'):
-            await admin_tools.handle_admin_buttons(query, data, db)
+        elif data.startswith('admin_') or data.startswith('broadcast_') or data in admin_tools.USER_CONTROL_ACTIONS:
+            await admin_tools.handle_admin_buttons(query, data, db, context)
     
     async def show_balance(self, query):
-        user_id = query.from_user.id
-        balance = db.get_user_balance(user_id)
+        profile = await db.get_user_account(query.from_user.id)
         currency = db.get_setting('currency')
         
         text = f"💰 *Your Balance*\n\n"
-        text += f"Current Balance: *{balance} {currency}*\n"
-        text += f"Total Orders: *{db.get_user_total_orders(user_id)}*\n"
-        text += f"Total Deposits: *{db.get_user_total_deposits(user_id)} {currency}*\n"
+        text += f"Current Balance: *{profile.balance} {currency}*\n"
+        text += f"Total Orders: *{profile.total_orders}*\n"
+        text += f"Total Deposits: *{profile.total_deposits} {currency}*\n"
         
         await query.edit_message_text(
             text,
@@ -172,8 +315,9 @@ class SMMBot:
             reply_markup=keyboards.back_to_main()
         )
     
-    async def show_services(self, query):
-        categories = db.get_service_categories()
+    async def show_services(self, query, page=1):
+        await self.catalog.refresh()
+        categories = self.catalog.category_items
         
         if not categories:
             await query.edit_message_text(
@@ -183,26 +327,20 @@ class SMMBot:
             return
         
         text = "🛒 *Select Service Category*\n\n"
-        keyboard = []
-        
-        for category in categories:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"{category} Services",
-                    callback_data=f"category_{category}"
-                )
-            ])
-        
-        keyboard.append([InlineKeyboardButton("🔙 Back", callback_data='main_menu')])
+        items, page, total_pages = catalog.paginate(categories, page)
         
         await query.edit_message_text(
             text,
             parse_mode=ParseMode.MARKDOWN,
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=keyboards.pagination_keyboard(
+                items, page, total_pages, 'category',
+                nav_prefix='services_', back_data='main_menu'
+            )
         )
     
-    async def show_category_services(self, query, category):
-        services_list = db.get_services_by_category(category)
+    async def show_category_services(self, query, category, page=1):
+        await self.catalog.refresh()
+        services_list = self.catalog.get_services_by_category(category)
         
         if not services_list:
             await query.edit_message_text(
@@ -212,38 +350,63 @@ class SMMBot:
             return
         
         text = f"📦 *{category} Services*\n\n"
-        keyboard = []
-        
-        for service in services_list:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"{service['name']} - {service['price']}৳",
-                    callback_data=f"service_{service['id']}"
-                )
-            ])
-        
-        keyboard.append([InlineKeyboardButton("🔙 Back", callback_data='services')])
+        items, page, total_pages = catalog.paginate(services_list, page)
+        items = [{'id': service['id'], 'name': service['label']} for service in items]
         
         await query.edit_message_text(
             text,
             parse_mode=ParseMode.MARKDOWN,
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=keyboards.pagination_keyboard(
+                items, page, total_pages, 'service',
+                nav_prefix=f"category_{category}|", back_data='services'
+            )
         )
     
+    async def find_service(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # /find <name prefix> jumps straight to matching services
+        prefix = ' '.join(context.args).strip()
+        if not prefix:
+            self.auto_delete.track(await update.message.reply_text("Usage: /find <service name>"))
+            return
+        
+        await self.catalog.refresh()
+        matches = self.catalog.find_by_prefix(prefix)
+        if not matches:
+            self.auto_delete.track(await update.message.reply_text(
+                f"📭 No services starting with \"{prefix}\".",
+                reply_markup=keyboards.back_to_main()
+            ))
+            return
+        
+        keyboard = [
+            [InlineKeyboardButton(service['label'], callback_data=f"service_{service['id']}")]
+            for service in matches
+        ]
+        keyboard.append([InlineKeyboardButton("🔙 Back", callback_data='main_menu')])
+        
+        self.auto_delete.track(await update.message.reply_text(
+            f"🔎 *Services matching \"{escape_markdown(prefix)}\"*",
+            parse_mode=ParseMode.MARKDOWN,
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        ))
+    
     async def start_deposit(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         if query:
+            await query.answer()
+            if not await self.pass_join_gate(update, context):
+                return ConversationHandler.END
             await query.edit_message_text(
                 "💳 *Deposit Funds*\n\n"
                 "Enter the amount you want to deposit:",
                 parse_mode=ParseMode.MARKDOWN
             )
         else:
-            await update.message.reply_text(
+            self.auto_delete.track(await update.message.reply_text(
                 "💳 *Deposit Funds*\n\n"
                 "Enter the amount you want to deposit:",
                 parse_mode=ParseMode.MARKDOWN
-            )
+            ))
         
         return DEPOSIT_AMOUNT
     
@@ -253,10 +416,10 @@ class SMMBot:
             min_deposit = float(db.get_setting('deposit_minimum'))
             
             if amount < min_deposit:
-                await update.message.reply_text(
+                self.auto_delete.track(await update.message.reply_text(
                     f"❌ Minimum deposit amount is {min_deposit}৳\n"
                     f"Please enter a valid amount:"
-                )
+                ))
                 return DEPOSIT_AMOUNT
             
             context.user_data['deposit_amount'] = amount
@@ -264,27 +427,32 @@ class SMMBot:
             # Show deposit instructions
             instructions = db.get_setting('deposit_instructions')
             
-            await update.message.reply_text(
+            self.auto_delete.track(await update.message.reply_text(
                 f"📋 *Deposit Instructions*\n\n{instructions}\n\n"
                 f"Amount: *{amount}৳*\n\n"
                 "Please send the Transaction ID:",
                 parse_mode=ParseMode.MARKDOWN
-            )
+            ))
             
             return DEPOSIT_TRX_ID
         except ValueError:
-            await update.message.reply_text(
+            self.auto_delete.track(await update.message.reply_text(
                 "❌ Please enter a valid number for the deposit amount:"
-            )
+            ))
             return DEPOSIT_AMOUNT
     
     async def get_deposit_trxid(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        trx_id = update.message.text
+        trx_id = update.message.text.strip()
         amount = context.user_data.get('deposit_amount')
         user_id = update.effective_user.id
         
-        # Save deposit to database
-        db.create_deposit(user_id, amount, trx_id)
+        # Save deposit to database (the unique index rejects reused IDs)
+        if await db.create_deposit(user_id, amount, trx_id) is None:
+            self.auto_delete.track(await update.message.reply_text(
+                "❌ This Transaction ID has already been submitted.\n"
+                "Please check it and send the correct one:"
+            ))
+            return DEPOSIT_TRX_ID
         
         await update.message.reply_text(
             "✅ *Deposit Request Submitted!*\n\n"
@@ -295,20 +463,25 @@ class SMMBot:
         )
         
         # Notify admin
-        await self.notify_admin_deposit(user_id, amount, trx_id)
+        self.notify_admin_deposit(user_id, amount, trx_id)
         
         return ConversationHandler.END
     
     async def start_order(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
+        await query.answer()
+        if not await self.pass_join_gate(update, context):
+            return ConversationHandler.END
         service_id = int(query.data.split('_')[1])
         
-        service = db.get_service(service_id)
+        await self.catalog.refresh()
+        service = self.catalog.get_service(service_id)
         if not service:
             await query.edit_message_text("Service not found.")
-            return
+            return ConversationHandler.END
         
-        context.user_data['order_service'] = service
+        # Only the id is kept, so user_data stays small and always sees current prices
+        context.user_data['order_service_id'] = service_id
         
         await query.edit_message_text(
             f"📝 *Order: {service['name']}*\n\n"
@@ -324,76 +497,79 @@ class SMMBot:
         link = update.message.text
         context.user_data['order_link'] = link
         
-        await update.message.reply_text(
+        self.auto_delete.track(await update.message.reply_text(
             "Now send the quantity:"
-        )
+        ))
         
         return ORDER_QUANTITY
     
     async def get_order_quantity(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         try:
             quantity = int(update.message.text)
-            service = context.user_data.get('order_service')
+            await self.catalog.refresh()
+            service = self.catalog.get_service(context.user_data.get('order_service_id'))
             link = context.user_data.get('order_link')
             user_id = update.effective_user.id
             
+            if not service:
+                self.auto_delete.track(await update.message.reply_text(
+                    "This service is no longer available.",
+                    reply_markup=keyboards.main_menu(db)
+                ))
+                return ConversationHandler.END
+            
             if quantity < service['min_quantity'] or quantity > service['max_quantity']:
-                await update.message.reply_text(
+                self.auto_delete.track(await update.message.reply_text(
                     f"Quantity must be between {service['min_quantity']} and {service['max_quantity']}"
-                )
+                ))
                 return ORDER_QUANTITY
             
             # Calculate total price
             total_price = (service['price'] * quantity) / 1000
             
-            # Check balance
-            user_balance = db.get_user_balance(user_id)
-            if user_balance < total_price:
-                await update.message.reply_text(
+            # Debit balance and create order in one transaction
+            order_id = await db.place_order(user_id, service['id'], link, quantity, total_price)
+            if order_id is None:
+                user_balance = (await db.get_user_account(user_id)).balance
+                self.auto_delete.track(await update.message.reply_text(
                     f"❌ Insufficient balance!\n"
                     f"Required: {total_price}৳ | Available: {user_balance}৳",
                     reply_markup=keyboards.main_menu(db)
-                )
+                ))
                 return ConversationHandler.END
             
-            # Create order
-            db.create_order(user_id, service['id'], link, quantity, total_price)
-            
-            # Deduct balance
-            db.update_user_balance(user_id, -total_price)
-            
             await update.message.reply_text(
                 f"✅ *Order Placed Successfully!*\n\n"
                 f"Service: {service['name']}\n"
                 f"Link: {link}\n"
                 f"Quantity: {quantity}\n"
                 f"Total: {total_price}৳\n\n"
-                f"Order ID: #{db.get_last_order_id()}",
+                f"Order ID: #{order_id}",
                 parse_mode=ParseMode.MARKDOWN,
                 reply_markup=keyboards.main_menu(db)
             )
             
             # Notify admin
-            await self.notify_admin_order(user_id, service['name'], quantity, total_price)
+            self.notify_admin_order(user_id, service['name'], quantity, total_price)
             
             return ConversationHandler.END
         except ValueError:
-            await update.message.reply_text("Please enter a valid number for quantity:")
+            self.auto_delete.track(await update.message.reply_text("Please enter a valid number for quantity:"))
             return ORDER_QUANTITY
     
     async def show_invite(self, query):
         user_id = query.from_user.id
         invite_bonus = db.get_setting('invite_bonus')
+        profile = await db.get_user_account(user_id)
         
-        # Generate referral link
-        bot_username = (await self.application.bot.get_me()).username
-        referral_link = f"https://t.me/{bot_username}?start={user_id}"
+        # Generate referral link (bot username is cached at warm-up)
+        referral_link = f"https://t.me/{self.bot_username}?start={user_id}"
         
         text = f"👥 *Invite Friends & Earn*\n\n"
         text += f"Invite your friends and get *{invite_bonus}৳* for each referral!\n\n"
         text += f"Your referral link:\n`{referral_link}`\n\n"
-        text += f"Total Referrals: *{db.get_user_referrals(user_id)}*\n"
-        text += f"Earned from referrals: *{db.get_referral_earnings(user_id)}৳*"
+        text += f"Total Referrals: *{profile.referrals}*\n"
+        text += f"Earned from referrals: *{profile.referral_earnings(float(invite_bonus))}৳*"
         
         keyboard = [[InlineKeyboardButton("🔙 Back", callback_data='main_menu')]]
         
@@ -419,7 +595,7 @@ class SMMBot:
         )
     
     async def show_statistics(self, query):
-        stats = db.get_statistics()
+        stats = await db.get_statistics()
         
         text = "📈 *Bot Statistics*\n\n"
         text += f"👥 Total Users: *{stats['total_users']}*\n"
@@ -440,8 +616,8 @@ class SMMBot:
         user_id = update.effective_user.id
         
         # Check if user is admin
-        if not db.is_admin(user_id):
-            await update.message.reply_text("❌ Access denied!")
+        if not await db.is_admin(user_id):
+            self.auto_delete.track(await update.message.reply_text("❌ Access denied!"))
             return
         
         keyboard = keyboards.admin_panel()
@@ -453,53 +629,135 @@ class SMMBot:
             reply_markup=keyboard
         )
     
+    async def show_metrics(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not await db.is_admin(update.effective_user.id):
+            self.auto_delete.track(await update.message.reply_text("❌ Access denied!"))
+            return
+        
+        await update.message.reply_text(metrics.registry.summary(), parse_mode=ParseMode.MARKDOWN)
+    
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Handle admin commands and messages
         user_id = update.effective_user.id
         
-        if db.is_admin(user_id):
+        if await db.is_admin(user_id):
             await admin_tools.handle_admin_message(update, context, db)
     
     async def cancel_conversation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        await update.message.reply_text(
+        self.auto_delete.track(await update.message.reply_text(
             "Operation cancelled.",
             reply_markup=keyboards.main_menu(db)
-        )
+        ))
         return ConversationHandler.END
     
-    async def notify_admin_deposit(self, user_id, amount, trx_id):
-        # Get all admins
-        admins = db.get_admins()
-        
-        for admin_id in admins:
-            try:
-                await self.application.bot.send_message(
-                    admin_id,
-                    f"📥 *New Deposit Request*\n\n"
-                    f"User: {user_id}\n"
-                    f"Amount: {amount}৳\n"
-                    f"TRX ID: {trx_id}",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            except:
-                pass
-    
-    async def notify_admin_order(self, user_id, service_name, quantity, total_price):
-        admins = db.get_admins()
-        
-        for admin_id in admins:
-            try:
-                await self.application.bot.send_message(
-                    admin_id,
-                    f"🛒 *New Order*\n\n"
-                    f"User: {user_id}\n"
-                    f"Service: {service_name}\n"
-                    f"Quantity: {quantity}\n"
-                    f"Total: {total_price}৳",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            except:
-                pass
-
+    async def restart_conversation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await self.start(update, context)
+        return ConversationHandler.END
+    
+    async def leave_conversation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # Any other button abandons the open deposit or order flow
+        await self.button_handler(update, context)
+        return ConversationHandler.END
+    
+    @metrics.timed('notify_admin_deposit')
+    def notify_admin_deposit(self, user_id, amount, trx_id):
+        # Queued; the notifier sends it to all admins in the background
+        self.notifier.notify(
+            f"📥 *New Deposit Request*\n\n"
+            f"User: {user_id}\n"
+            f"Amount: {amount}৳\n"
+            f"TRX ID: {escape_markdown(trx_id)}"
+        )
+    
+    @metrics.timed('notify_admin_order')
+    def notify_admin_order(self, user_id, service_name, quantity, total_price):
+        self.notifier.notify(
+            f"🛒 *New Order*\n\n"
+            f"User: {user_id}\n"
+            f"Service: {escape_markdown(service_name)}\n"
+            f"Quantity: {quantity}\n"
+            f"Total: {total_price}৳"
+        )
+    
+    @property
+    def queue_depth(self):
+        # Updates fetched but not picked up yet, plus those being processed
+        return self.application.update_queue.qsize() + self.application.update_processor.queue_depth
+    
+    async def post_init(self, application):
+        await self.warm_up(application)
+        
+        self.notifier.start()
+        self.seen_users.start()
+        self.membership.start()
+        self.auto_delete.start()
+        self.maintenance.start()
+        await self.metrics_server.start()
+        
+        # Continue broadcasts interrupted by the last restart
+        await self.broadcaster.resume()
+    
+    async def warm_up(self, application):
+        # Load everything the first clicks need before polling starts
+        started = time.perf_counter()
+        
+        # Application.initialize() has already fetched the bot identity via getMe
+        self.bot_username = application.bot.username
+        
+        await db.invalidate_settings()
+        admins, banned, services, deletions = await asyncio.gather(
+            db.load_admins(),
+            db.load_banned_users(),
+            self.catalog.load(),
+            self.auto_delete.load()
+        )
+        
+        logger.info(
+            "Warm-up finished in %.1f ms: @%s, %s settings, %s admins, %s banned users, %s services, "
+            "%s pending deletions",
+            (time.perf_counter() - started) * 1000, self.bot_username,
+            db.settings_cache_stats()['cached_keys'], admins, banned, services, deletions
+        )
+    
+    async def post_stop(self, application):
+        # Everything that talks to the Bot API stops here, while the bot is
+        # still initialized; Application.shutdown() closes its HTTP client.
+        # The admin notifier goes last to deliver what the others queued.
+        await self.maintenance.stop()
+        await self.membership.stop()
+        await self.broadcaster.stop()
+        await self.auto_delete.stop()
+        await self.user_notifier.stop()
+        await self.notifier.stop()
+    
+    async def shutdown(self, application):
+        # After PTB's final persistence flush
+        await self.seen_users.stop()
+        await self.metrics_server.stop()
+        db.close()
+    
     def run(self):
-        self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+        if Config.RUN_MODE == 'webhook':
+            self.run_webhook()
+        else:
+            self.application.run_polling(allowed_updates=ALLOWED_UPDATES)
+    
+    def run_webhook(self):
+        self.application.run_webhook(**webhook_options())
+
+def webhook_options():
+    # Telegram posts updates to WEBHOOK_URL/WEBHOOK_PATH; the listener
+    # rejects requests without the secret token header. Without WEBHOOK_URL
+    # PTB would register its local listen address, which Telegram rejects.
+    if not Config.WEBHOOK_URL:
+        raise ValueError("RUN_MODE=webhook needs WEBHOOK_URL, the public HTTPS base URL Telegram posts to")
+    url_path = Config.WEBHOOK_PATH.strip('/')
+    return {
+        'listen': Config.WEBHOOK_LISTEN,
+        'port': Config.WEBHOOK_PORT,
+        'url_path': url_path,
+        'webhook_url': f"{Config.WEBHOOK_URL.rstrip('/')}/{url_path}",
+        'secret_token': Config.WEBHOOK_SECRET or None,
+        'max_connections': Config.WEBHOOK_MAX_CONNECTIONS,
+        'allowed_updates': ALLOWED_UPDATES
+    }
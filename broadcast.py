@@ -0,0 +1,141 @@
+# broadcast.py
+import asyncio
+import logging
+import time
+from telegram.error import RetryAfter, Forbidden, BadRequest, TelegramError
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+AUDIENCE_NAMES = {
+    'all': 'All Users',
+    'active': 'Active Users',
+    'depositors': 'Depositors'
+}
+
+class RateLimiter:
+    # Spaces sends evenly to stay under Telegram's global limit. Every
+    # recipient gets one message per job, so the per-chat limit never applies.
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next_slot = 0
+        self._lock = asyncio.Lock()
+    
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_slot > now:
+                await asyncio.sleep(self._next_slot - now)
+                now = self._next_slot
+            self._next_slot = now + self.interval
+    
+    def pause(self, seconds):
+        # Flood control: hold every sender until Telegram lets us continue
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+class BroadcastEngine:
+    def __init__(self, bot, db, rate=None, concurrency=None, chunk_size=500, report_interval=5, limiter=None):
+        self.bot = bot
+        self.db = db
+        # Pass the bot-wide limiter so every bulk sender shares one budget
+        self.limiter = limiter or RateLimiter(rate or Config.BROADCAST_RATE)
+        self.semaphore = asyncio.Semaphore(concurrency or Config.BROADCAST_CONCURRENCY)
+        self.chunk_size = chunk_size
+        self.report_interval = report_interval
+        self.max_retries = 3
+        self.tasks = {}
+    
+    async def start(self, admin_id, audience, from_chat_id, message_id, mode='copy'):
+        job_id = await self.db.create_broadcast_job(admin_id, audience, from_chat_id, message_id, mode)
+        self._spawn(await self.db.get_broadcast_job(job_id))
+        return job_id
+    
+    async def resume(self):
+        # Pick up jobs that were still running when the bot stopped
+        jobs = await self.db.get_unfinished_broadcasts()
+        for job in jobs:
+            logger.info("Resuming broadcast #%s after user %s", job['id'], job['last_user_id'])
+            self._spawn(job)
+        return len(jobs)
+    
+    async def stop(self):
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _spawn(self, job):
+        task = asyncio.create_task(self._run(job))
+        self.tasks[job['id']] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job['id'], None))
+    
+    async def _run(self, job):
+        sent, failed, cursor = job['sent'], job['failed'], job['last_user_id']
+        started = time.monotonic()
+        sent_before = sent + failed
+        last_report = started
+        status = await self._report(job, None, sent, failed, 0)
+        
+        try:
+            while True:
+                user_ids = await self.db.get_broadcast_recipients(job['audience'], cursor, self.chunk_size)
+                if not user_ids:
+                    break
+                
+                results = await asyncio.gather(*(self._send(job, user_id) for user_id in user_ids))
+                delivered = sum(results)
+                sent += delivered
+                failed += len(results) - delivered
+                cursor = user_ids[-1]
+                await self.db.update_broadcast_progress(job['id'], cursor, sent, failed)
+                
+                now = time.monotonic()
+                if now - last_report >= self.report_interval:
+                    rate = (sent + failed - sent_before) / (now - started)
+                    status = await self._report(job, status, sent, failed, rate)
+                    last_report = now
+            
+            await self.db.finish_broadcast(job['id'], sent, failed)
+            rate = (sent + failed - sent_before) / max(time.monotonic() - started, 1e-6)
+            await self._report(job, status, sent, failed, rate, done=True)
+        except asyncio.CancelledError:
+            # Progress is already stored per chunk; the job resumes on next start
+            raise
+        except Exception:
+            logger.exception("Broadcast #%s stopped", job['id'])
+    
+    async def _send(self, job, user_id):
+        for _ in range(self.max_retries):
+            await self.limiter.wait()
+            try:
+                async with self.semaphore:
+                    if job['mode'] == 'forward':
+                        await self.bot.forward_message(user_id, job['from_chat_id'], job['message_id'])
+                    else:
+                        await self.bot.copy_message(user_id, job['from_chat_id'], job['message_id'])
+                return True
+            except RetryAfter as e:
+                self.limiter.pause(e.retry_after)
+            except (Forbidden, BadRequest):
+                # Blocked the bot, deactivated or never started a chat
+                return False
+            except TelegramError as e:
+                logger.warning("Broadcast #%s to %s failed: %s", job['id'], user_id, e)
+                return False
+        return False
+    
+    async def _report(self, job, status, sent, failed, rate, done=False):
+        title = "✅ Broadcast finished" if done else "📢 Broadcasting"
+        audience = AUDIENCE_NAMES.get(job['audience'], job['audience'])
+        text = f"{title} #{job['id']} ({audience})\n\n"
+        text += f"Sent: {sent}\n"
+        text += f"Failed: {failed}\n"
+        text += f"Speed: {rate:.1f} msg/s"
+        
+        try:
+            if status is None:
+                return await self.bot.send_message(job['admin_id'], text)
+            await self.bot.edit_message_text(text, chat_id=status.chat_id, message_id=status.message_id)
+        except TelegramError as e:
+            logger.warning("Broadcast #%s status update failed: %s", job['id'], e)
+        return status
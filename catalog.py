@@ -0,0 +1,84 @@
+# catalog.py
+import asyncio
+import math
+from bisect import bisect_left
+
+# Services shown per page when browsing
+PAGE_SIZE = 10
+
+class ServiceCatalog:
+    # In-memory index of the active services: by id, by category (cheapest
+    # first), by price and by lowercase name for prefix search. Browsing never
+    # queries the database; the index is rebuilt only after services change.
+    def __init__(self, db):
+        self.db = db
+        self.version = None
+        self.by_id = {}
+        self.by_category = {}
+        self.by_price = []
+        self.categories = []
+        self.category_items = []
+        self.name_index = []
+        self._loading = None
+    
+    async def load(self):
+        version = self.db.services_version
+        services = await self.db.get_all_services()
+        by_id = {}
+        by_category = {}
+        for service in services:
+            service['label'] = f"{service['name']} - {service['price']}৳"
+            by_id[service['id']] = service
+            by_category.setdefault(service['category'], []).append(service)
+        
+        for items in by_category.values():
+            items.sort(key=lambda service: (service['price'], service['id']))
+        
+        # Swap in whole structures so readers never see a half-built index
+        self.by_id = by_id
+        self.by_category = by_category
+        self.by_price = sorted(services, key=lambda service: (service['price'], service['id']))
+        self.categories = sorted(by_category)
+        self.category_items = [{'id': category, 'name': f"{category} Services"} for category in self.categories]
+        self.name_index = sorted((service['name'].lower(), service['id']) for service in services)
+        self.version = version
+        return len(by_id)
+    
+    async def refresh(self):
+        # Free unless a service was added or edited since the last load.
+        # Concurrent callers share one load; the loop catches edits made
+        # while it ran.
+        while self.version != self.db.services_version:
+            if self._loading is None:
+                self._loading = asyncio.ensure_future(self.load())
+                self._loading.add_done_callback(self._load_done)
+            await asyncio.shield(self._loading)
+    
+    def _load_done(self, task):
+        self._loading = None
+    
+    def get_service(self, service_id):
+        return self.by_id.get(service_id)
+    
+    def get_services_by_category(self, category):
+        return self.by_category.get(category, [])
+    
+    def get_categories(self):
+        return self.categories
+    
+    def find_by_prefix(self, prefix, limit=PAGE_SIZE):
+        prefix = prefix.lower()
+        start = bisect_left(self.name_index, (prefix,))
+        results = []
+        for name, service_id in self.name_index[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            results.append(self.by_id[service_id])
+        return results
+
+def paginate(items, page, page_size=PAGE_SIZE):
+    # Returns (items on the page, clamped page number, total pages)
+    total_pages = max(1, math.ceil(len(items) / page_size))
+    page = min(max(page, 1), total_pages)
+    start = (page - 1) * page_size
+    return items[start:start + page_size], page, total_pages
@@ -14,8 +14,72 @@ class Config:
     # Database path
     DATABASE_PATH = os.getenv("DATABASE_PATH", "smm_panel.db")
     
+    # SQLite storage profile: "durable" or "throughput" (see database.STORAGE_PROFILES)
+    STORAGE_PROFILE = os.getenv("STORAGE_PROFILE", "durable")
+    
+    # Local hour (0-23) for the daily ANALYZE/vacuum/checkpoint run (-1 to disable)
+    MAINTENANCE_HOUR = int(os.getenv("MAINTENANCE_HOUR", "4"))
+    
     # Auto delete messages after seconds (0 to disable)
     AUTO_DELETE = int(os.getenv("AUTO_DELETE", "60"))
     
     # Anti-spam delay in seconds
     ANTI_SPAM_DELAY = int(os.getenv("ANTI_SPAM_DELAY", "2"))
+    
+    # Updates a user may send back to back before ANTI_SPAM_DELAY applies
+    ANTI_SPAM_BURST = int(os.getenv("ANTI_SPAM_BURST", "3"))
+
+    
+    # Broadcast speed (messages per second across all chats) and parallel sends
+    BROADCAST_RATE = int(os.getenv("BROADCAST_RATE", "25"))
+    BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "10"))
+    
+    # Minimum seconds between admin notification messages (bursts become digests)
+    NOTIFY_DIGEST_INTERVAL = float(os.getenv("NOTIFY_DIGEST_INTERVAL", "5"))
+    
+    # Registered users remembered in memory, and how often changed names are saved
+    SEEN_USERS_CACHE_SIZE = int(os.getenv("SEEN_USERS_CACHE_SIZE", "100000"))
+    PROFILE_FLUSH_INTERVAL = float(os.getenv("PROFILE_FLUSH_INTERVAL", "30"))
+    
+    # Balance/invite profiles kept in memory
+    PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+    
+    # Seconds to trust a group membership check (members / non-members)
+    MEMBERSHIP_TTL = int(os.getenv("MEMBERSHIP_TTL", "600"))
+    MEMBERSHIP_NEGATIVE_TTL = int(os.getenv("MEMBERSHIP_NEGATIVE_TTL", "30"))
+    
+    # How updates arrive: "polling" or "webhook"
+    RUN_MODE = os.getenv("RUN_MODE", "polling")
+    
+    # Webhook mode: public base URL Telegram posts to, and the local listener
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+    
+    # Updates processed at the same time (one user's updates always run in order)
+    CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "64"))
+    
+    # Group commit: writes arriving within DB_COMMIT_WINDOW seconds share one
+    # transaction of up to DB_COMMIT_BATCH writes (0 commits every write alone)
+    DB_COMMIT_WINDOW = float(os.getenv("DB_COMMIT_WINDOW", "0.005"))
+    DB_COMMIT_BATCH = int(os.getenv("DB_COMMIT_BATCH", "200"))
+    
+    # SQL tracing (1 to enable): attributes statements to handlers, logs
+    # statements slower than SQL_SLOW_MS with their query plan and handler
+    # calls running more than SQL_QUERY_BUDGET statements
+    SQL_TRACE = int(os.getenv("SQL_TRACE", "0"))
+    SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "50"))
+    SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "10"))
+    
+    # Prometheus text endpoint (http://METRICS_LISTEN:METRICS_PORT/metrics, 0 to disable)
+    METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+    
+    # Seconds of inactivity after which a deposit or order conversation ends
+    CONVERSATION_TIMEOUT = float(os.getenv("CONVERSATION_TIMEOUT", "900"))
+    
+    # Seconds between saves of conversation states and user_data
+    PERSISTENCE_INTERVAL = float(os.getenv("PERSISTENCE_INTERVAL", "10"))
\ No newline at end of file
@@ -1,13 +1,173 @@
 # database.py
 import sqlite3
 import json
+import os
+import time
 from datetime import datetime
+from pathlib import Path
+from config import Config
+
+# Storage profiles selectable with Config.STORAGE_PROFILE. Both use WAL so
+# the async reader pool can read while the writer commits.
+STORAGE_PROFILES = {
+    # Every commit is synced to disk before it is acknowledged
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT'
+    },
+    # A power loss may drop the last commits, but the file never corrupts
+    'throughput': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY'
+    }
+}
 
 class Database:
-    def __init__(self, db_name="smm_panel.db"):
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+    def __init__(self, db_name="smm_panel.db", read_only=False, profile=None):
+        self.db_name = db_name
+        if read_only:
+            # Read-only connections are used by the async reader pool
+            uri = Path(db_name).absolute().as_uri() + '?mode=ro'
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(db_name, check_same_thread=False)
         self.cursor = self.conn.cursor()
-        self.create_tables()
+        
+        # In-memory copy of the settings table, loaded on first read
+        self._settings = None
+        self.settings_version = 0
+        self.settings_hits = 0
+        self.settings_misses = 0
+        
+        # Bumped on every service write so cached catalogs know to rebuild
+        self.services_version = 0
+        
+        # Set while run_batch applies a group of writes in one transaction;
+        # _after_commit callbacks wait here until the batch has committed
+        self._in_batch = False
+        self._after_batch = []
+        
+        if not read_only:
+            # Only takes effect on a new file; lets maintenance free pages incrementally
+            self.cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        self.apply_storage_profile(profile or Config.STORAGE_PROFILE, read_only)
+        
+        if not read_only:
+            self.create_tables()
+    
+    def enable_tracing(self, tracer):
+        # Sends every statement on this connection through an sql_trace.SQLTracer
+        self.cursor = self.conn.cursor(tracer.cursor_class)
+        self.conn.set_trace_callback(tracer.on_statement)
+    
+    def apply_storage_profile(self, name, read_only=False):
+        if name not in STORAGE_PROFILES:
+            raise ValueError(f"Unknown storage profile: {name}")
+        profile = STORAGE_PROFILES[name]
+        
+        # The journal mode is stored in the file and set by the writer
+        if not read_only:
+            self.cursor.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+            self.cursor.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        self.cursor.execute(f"PRAGMA cache_size = {profile['cache_size']}")
+        self.cursor.execute(f"PRAGMA mmap_size = {profile['mmap_size']}")
+        self.cursor.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+        self.storage_profile = name
+    
+    def _commit(self):
+        # Inside a group commit the batch commits once at the end
+        if not self._in_batch:
+            self.conn.commit()
+    
+    def _after_commit(self, callback):
+        # For in-memory state that must not run ahead of what readers can see
+        if self._in_batch:
+            self._after_batch.append(callback)
+        else:
+            callback()
+    
+    def _services_changed(self):
+        self.services_version += 1
+    
+    def _rollback(self):
+        # Inside a group commit only this write's savepoint is undone
+        if self._in_batch:
+            self.cursor.execute('ROLLBACK TO write')
+        else:
+            self.conn.rollback()
+    
+    def run_batch(self, calls):
+        # Group commit: runs the write calls (bound Database methods) in one
+        # transaction, each inside its own savepoint so a failing write does
+        # not undo the others. Returns (ok, result or exception) per call.
+        outcomes = []
+        self._in_batch = True
+        try:
+            if not self.conn.in_transaction:
+                self.cursor.execute('BEGIN')
+            for call in calls:
+                self.cursor.execute('SAVEPOINT write')
+                pending = len(self._after_batch)
+                try:
+                    outcomes.append((True, call()))
+                except Exception as e:
+                    self.cursor.execute('ROLLBACK TO write')
+                    del self._after_batch[pending:]
+                    outcomes.append((False, e))
+                self.cursor.execute('RELEASE write')
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self._in_batch = False
+            callbacks, self._after_batch = self._after_batch, []
+        
+        for callback in callbacks:
+            callback()
+        return outcomes
+    
+    # Maintenance (must run outside a transaction, on the writer connection)
+    def run_maintenance(self, vacuum_pages=10000, analysis_limit=1000):
+        # Refreshes planner statistics, hands up to vacuum_pages free pages back
+        # to the filesystem and folds the WAL into the main file. Returns the
+        # numbers for the admin report.
+        started = time.perf_counter()
+        self.conn.commit()
+        
+        # Measured first: the TRUNCATE checkpoint below leaves an empty WAL
+        wal_path = self.db_name + '-wal'
+        wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        
+        # analysis_limit samples large indexes so ANALYZE stays quick on big files
+        self.cursor.execute(f'PRAGMA analysis_limit = {int(analysis_limit)}')
+        self.cursor.execute('ANALYZE')
+        
+        free_before = self.cursor.execute('PRAGMA freelist_count').fetchone()[0]
+        incremental = self.cursor.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        if incremental:
+            # executescript steps the pragma to completion; execute() frees one page
+            self.conn.executescript(f'PRAGMA incremental_vacuum({int(vacuum_pages)});')
+        free_after = self.cursor.execute('PRAGMA freelist_count').fetchone()[0]
+        
+        busy, wal_pages, checkpointed = self.cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+        return {
+            'db_size': os.path.getsize(self.db_name),
+            'wal_size': wal_size,
+            'page_size': self.cursor.execute('PRAGMA page_size').fetchone()[0],
+            'free_pages': free_after,
+            'vacuumed_pages': free_before - free_after,
+            'incremental_vacuum': incremental,
+            'checkpoint_busy': bool(busy),
+            'checkpointed_pages': checkpointed,
+            'seconds': time.perf_counter() - started
+        }
     
     def create_tables(self):
         # Users table
@@ -65,7 +225,7 @@ class Database:
             method TEXT,
             transaction_id TEXT,
             status TEXT DEFAULT 'pending',
-            deposit_date TIMESTAMP DEFAULT DEFAULT CURRENT_TIMESTAMP,
+            deposit_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             approved_by INTEGER,
             approved_date TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users (user_id)
@@ -89,10 +249,83 @@ class Database:
             sent_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )''')
         
+        # Broadcast jobs with their resume cursor
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS broadcast_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_id INTEGER,
+            audience TEXT,
+            mode TEXT DEFAULT 'copy',
+            from_chat_id INTEGER,
+            message_id INTEGER,
+            status TEXT DEFAULT 'running',
+            last_user_id INTEGER DEFAULT 0,
+            sent INTEGER DEFAULT 0,
+            failed INTEGER DEFAULT 0,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_date TIMESTAMP
+        )''')
+        
+        # Bot messages waiting for auto-deletion
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS scheduled_deletions (
+            chat_id INTEGER,
+            message_id INTEGER,
+            due_at REAL,
+            PRIMARY KEY (chat_id, message_id)
+        )''')
+        
+        # ConversationHandler states and user_data kept across restarts
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS conversations (
+            name TEXT,
+            key TEXT,
+            state INTEGER,
+            PRIMARY KEY (name, key)
+        )''')
+        
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS user_data (
+            user_id INTEGER PRIMARY KEY,
+            data TEXT
+        )''')
+        
+        # Extra admins on top of Config.ADMIN_IDS
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS admins (
+            user_id INTEGER PRIMARY KEY,
+            added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''')
+        
+        # Running totals and per-day rollups kept up to date by the write paths
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value REAL DEFAULT 0
+        )''')
+        
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS stats_daily (
+            day TEXT,
+            name TEXT,
+            value REAL DEFAULT 0,
+            PRIMARY KEY (day, name)
+        )''')
+        
+        # Indexes for date filters and per-user lookups
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_joined_date ON users (joined_date)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_referral_by ON users (referral_by)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_banned ON users (user_id) WHERE banned = 1')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders (user_id)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_order_date ON orders (order_date)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_deposits_user_id ON deposits (user_id)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_deposits_status ON deposits (status)')
+        try:
+            # A transaction ID can only be submitted once
+            self.cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_deposits_transaction_id ON deposits (transaction_id)')
+        except sqlite3.IntegrityError:
+            # Older databases may already hold duplicates; they keep working without the check
+            pass
+        
+        self.backfill_statistics()
+        
         # Initialize default settings
         self.init_default_settings()
         
-        self.conn.commit()
+        self._commit()
     
     def init_default_settings(self):
         default_settings = {
@@ -118,6 +351,7 @@ class Database:
                 'rocket': '01XXXXXXXXX'
             }),
             'group_check': '1',
+            'group_id': '',
             'group_link': 'https://t.me/yourgroup',
             'group_message': '🔗 Join our group to use the bot:\n👉 https://t.me/yourgroup',
             'verify_button': '✅ I Have Joined'
@@ -126,4 +360,448 @@ class Database:
         for key, value in default_settings.items():
             self.cursor.execute('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)', (key, value))
         
-        self.conn.commit()
+        self._commit()
+    
+    # Settings (served from memory, written through to the table)
+    def load_settings(self):
+        self.cursor.execute('SELECT key, value FROM settings')
+        self._settings = dict(self.cursor.fetchall())
+        self.settings_misses += 1
+        return self._settings
+    
+    def _settings_cache(self):
+        if self._settings is None:
+            return self.load_settings()
+        self.settings_hits += 1
+        return self._settings
+    
+    def get_setting(self, key, default=None):
+        return self._settings_cache().get(key, default)
+    
+    def get_settings(self, keys):
+        settings = self._settings_cache()
+        return {key: settings.get(key) for key in keys}
+    
+    def set_setting(self, key, value):
+        value = str(value)
+        self.cursor.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, value))
+        self._commit()
+        
+        if self._settings is not None:
+            self._settings[key] = value
+        self.settings_version += 1
+    
+    def invalidate_settings(self):
+        # Drop the cached copy after the table was changed outside set_setting
+        self._settings = None
+        self.settings_version += 1
+    
+    def settings_cache_stats(self):
+        return {
+            'hits': self.settings_hits,
+            'misses': self.settings_misses,
+            'version': self.settings_version,
+            'cached_keys': len(self._settings) if self._settings is not None else 0
+        }
+    
+    # Users
+    def register_user(self, user_id, username, first_name, last_name, referral_by=None):
+        self.cursor.execute('''INSERT OR IGNORE INTO users (user_id, username, first_name, last_name, referral_by)
+            VALUES (?, ?, ?, ?, ?)''', (user_id, username, first_name, last_name, referral_by))
+        registered = self.cursor.rowcount > 0
+        if registered:
+            self._bump_stat('users')
+        self._commit()
+        return registered
+    
+    def get_user_profile(self, user_id):
+        self.cursor.execute('SELECT username, first_name, last_name FROM users WHERE user_id = ?', (user_id,))
+        row = self.cursor.fetchone()
+        return tuple(row) if row else None
+    
+    def update_user_profiles(self, rows):
+        # rows: (username, first_name, last_name, user_id)
+        self.cursor.executemany('''UPDATE users SET username = ?, first_name = ?, last_name = ?
+            WHERE user_id = ?''', rows)
+        self._commit()
+    
+    def is_user_banned(self, user_id):
+        self.cursor.execute('SELECT banned FROM users WHERE user_id = ?', (user_id,))
+        row = self.cursor.fetchone()
+        return bool(row and row[0])
+    
+    def get_banned_user_ids(self):
+        self.cursor.execute('SELECT user_id FROM users WHERE banned = 1')
+        return [row[0] for row in self.cursor.fetchall()]
+    
+    def set_user_banned(self, user_id, banned=True):
+        self.cursor.execute('UPDATE users SET banned = ? WHERE user_id = ?', (1 if banned else 0, user_id))
+        self._commit()
+        return self.cursor.rowcount > 0
+    
+    def get_user_balance(self, user_id):
+        self.cursor.execute('SELECT balance FROM users WHERE user_id = ?', (user_id,))
+        row = self.cursor.fetchone()
+        return row[0] if row else 0
+    
+    def update_user_balance(self, user_id, amount):
+        self.cursor.execute('UPDATE users SET balance = balance + ? WHERE user_id = ?', (amount, user_id))
+        self._commit()
+    
+    def get_user_total_orders(self, user_id):
+        self.cursor.execute('SELECT total_orders FROM users WHERE user_id = ?', (user_id,))
+        row = self.cursor.fetchone()
+        return row[0] if row else 0
+    
+    def get_user_total_deposits(self, user_id):
+        self.cursor.execute('SELECT total_deposits FROM users WHERE user_id = ?', (user_id,))
+        row = self.cursor.fetchone()
+        return row[0] if row else 0
+    
+    def get_user_referrals(self, user_id):
+        self.cursor.execute('SELECT referrals FROM users WHERE user_id = ?', (user_id,))
+        row = self.cursor.fetchone()
+        return row[0] if row else 0
+    
+    def get_user_account(self, user_id):
+        # Everything the balance and invite screens show, in one row
+        self.cursor.execute('''SELECT balance, total_orders, total_deposits, referrals FROM users
+            WHERE user_id = ?''', (user_id,))
+        return self.cursor.fetchone()
+    
+    def get_referral_earnings(self, user_id):
+        return self.get_user_referrals(user_id) * float(self.get_setting('invite_bonus', '0'))
+    
+    # Admins
+    def get_admins(self):
+        self.cursor.execute('SELECT user_id FROM admins')
+        admins = list(Config.ADMIN_IDS)
+        admins.extend(row[0] for row in self.cursor.fetchall() if row[0] not in admins)
+        return admins
+    
+    def is_admin(self, user_id):
+        if user_id in Config.ADMIN_IDS:
+            return True
+        self.cursor.execute('SELECT 1 FROM admins WHERE user_id = ?', (user_id,))
+        return self.cursor.fetchone() is not None
+    
+    # Services
+    def get_service_categories(self):
+        self.cursor.execute('SELECT DISTINCT category FROM services WHERE status = 1 ORDER BY category')
+        return [row[0] for row in self.cursor.fetchall()]
+    
+    def get_services_by_category(self, category):
+        self.cursor.execute('''SELECT id, category, name, description, price, min_quantity, max_quantity, status
+            FROM services WHERE category = ? AND status = 1 ORDER BY id''', (category,))
+        return [self._service_row(row) for row in self.cursor.fetchall()]
+    
+    def get_all_services(self):
+        self.cursor.execute('''SELECT id, category, name, description, price, min_quantity, max_quantity, status
+            FROM services WHERE status = 1 ORDER BY category, id''')
+        return [self._service_row(row) for row in self.cursor.fetchall()]
+    
+    def get_service(self, service_id):
+        self.cursor.execute('''SELECT id, category, name, description, price, min_quantity, max_quantity, status
+            FROM services WHERE id = ?''', (service_id,))
+        row = self.cursor.fetchone()
+        return self._service_row(row) if row else None
+    
+    def add_service(self, category, name, description, price, min_quantity, max_quantity):
+        self.cursor.execute('''INSERT INTO services (category, name, description, price, min_quantity, max_quantity)
+            VALUES (?, ?, ?, ?, ?, ?)''', (category, name, description, price, min_quantity, max_quantity))
+        self._commit()
+        self._after_commit(self._services_changed)
+        return self.cursor.lastrowid
+    
+    def update_service(self, service_id, **fields):
+        columns = ('category', 'name', 'description', 'price', 'min_quantity', 'max_quantity', 'status')
+        updates = {key: value for key, value in fields.items() if key in columns}
+        if not updates:
+            return False
+        
+        assignments = ', '.join(f"{key} = ?" for key in updates)
+        self.cursor.execute(f'UPDATE services SET {assignments} WHERE id = ?', (*updates.values(), service_id))
+        self._commit()
+        self._after_commit(self._services_changed)
+        return self.cursor.rowcount > 0
+    
+    def _service_row(self, row):
+        keys = ('id', 'category', 'name', 'description', 'price', 'min_quantity', 'max_quantity', 'status')
+        return dict(zip(keys, row))
+    
+    # Orders
+    def create_order(self, user_id, service_id, link, quantity, total_price):
+        self.cursor.execute('''INSERT INTO orders (user_id, service_id, link, quantity, total_price)
+            VALUES (?, ?, ?, ?, ?)''', (user_id, service_id, link, quantity, total_price))
+        order_id = self.cursor.lastrowid
+        self.cursor.execute('UPDATE users SET total_orders = total_orders + 1 WHERE user_id = ?', (user_id,))
+        self._bump_stat('orders')
+        self._commit()
+        return order_id
+    
+    def place_order(self, user_id, service_id, link, quantity, total_price):
+        # Debit and insert in one transaction; returns None on insufficient balance
+        try:
+            order_id = self._place_order(user_id, service_id, link, quantity, total_price)
+            if order_id is None:
+                self._rollback()
+            else:
+                self._commit()
+            return order_id
+        except Exception:
+            self._rollback()
+            raise
+    
+    def place_orders(self, orders):
+        # Bulk variant: one commit for the whole batch, one result per order
+        try:
+            order_ids = [self._place_order(*order) for order in orders]
+            self._commit()
+            return order_ids
+        except Exception:
+            self._rollback()
+            raise
+    
+    def _place_order(self, user_id, service_id, link, quantity, total_price):
+        self.cursor.execute('''UPDATE users SET balance = balance - ?, total_orders = total_orders + 1
+            WHERE user_id = ? AND balance >= ?''', (total_price, user_id, total_price))
+        if self.cursor.rowcount == 0:
+            return None
+        
+        self.cursor.execute('''INSERT INTO orders (user_id, service_id, link, quantity, total_price)
+            VALUES (?, ?, ?, ?, ?)''', (user_id, service_id, link, quantity, total_price))
+        order_id = self.cursor.lastrowid
+        self._bump_stat('orders')
+        return order_id
+    
+    def get_last_order_id(self):
+        self.cursor.execute('SELECT MAX(id) FROM orders')
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+    
+    # Deposits
+    def create_deposit(self, user_id, amount, transaction_id, method=None):
+        # Returns None if the transaction ID was already submitted
+        try:
+            self.cursor.execute('''INSERT INTO deposits (user_id, amount, method, transaction_id)
+                VALUES (?, ?, ?, ?)''', (user_id, amount, method, transaction_id))
+        except sqlite3.IntegrityError:
+            self._rollback()
+            return None
+        self._commit()
+        return self.cursor.lastrowid
+    
+    def approve_deposit(self, deposit_id, admin_id):
+        return bool(self.review_deposits(deposit_id, deposit_id, admin_id, True))
+    
+    def review_deposits(self, first_id, last_id, admin_id, approve):
+        # Approves or rejects every pending deposit with first_id <= id <= last_id
+        # in one transaction. Balances are credited with one statement per user.
+        # Returns the reviewed deposits as (id, user_id, amount, transaction_id).
+        try:
+            self.cursor.execute('''SELECT id, user_id, amount, transaction_id FROM deposits
+                WHERE status = ? AND id BETWEEN ? AND ?''', ('pending', first_id, last_id))
+            reviewed = self.cursor.fetchall()
+            if not reviewed:
+                return []
+            
+            self.cursor.execute('''UPDATE deposits SET status = ?, approved_by = ?, approved_date = CURRENT_TIMESTAMP
+                WHERE status = ? AND id BETWEEN ? AND ?''',
+                ('approved' if approve else 'rejected', admin_id, 'pending', first_id, last_id))
+            
+            if approve:
+                credits = {}
+                for _, user_id, amount, _ in reviewed:
+                    credits[user_id] = credits.get(user_id, 0) + amount
+                self.cursor.executemany('''UPDATE users SET balance = balance + ?, total_deposits = total_deposits + ?
+                    WHERE user_id = ?''', [(amount, amount, user_id) for user_id, amount in credits.items()])
+                self._bump_stat('deposits', sum(credits.values()))
+            self._commit()
+            return reviewed
+        except Exception:
+            self._rollback()
+            raise
+    
+    def get_pending_deposits_summary(self):
+        # (count, total amount, highest id) of the approval queue
+        self.cursor.execute('''SELECT COUNT(*), COALESCE(SUM(amount), 0), MAX(id) FROM deposits
+            WHERE status = ?''', ('pending',))
+        return self.cursor.fetchone()
+    
+    # Admin listings (keyset pagination: cost does not grow with the page number)
+    def _seek(self, select, key, keys, cursor, forward, limit, newest_first=False, where=None, params=()):
+        # forward means "next page" in display order
+        ascending = forward != newest_first
+        clauses = [where] if where else []
+        if cursor is not None:
+            clauses.append(f"{key} {'>' if ascending else '<'} ?")
+            params += (cursor,)
+        
+        sql = select
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += f" ORDER BY {key} {'ASC' if ascending else 'DESC'} LIMIT ?"
+        self.cursor.execute(sql, params + (limit + 1,))
+        rows = [dict(zip(keys, row)) for row in self.cursor.fetchall()]
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not forward:
+            rows.reverse()
+        
+        return {
+            'rows': rows,
+            'has_prev': has_more if not forward else cursor is not None,
+            'has_next': has_more if forward else True
+        }
+    
+    def list_pending_deposits(self, cursor=None, forward=True, limit=10):
+        # Oldest first, served by idx_deposits_status (status, rowid)
+        return self._seek(
+            'SELECT id, user_id, amount, method, transaction_id, deposit_date FROM deposits',
+            'id', ('id', 'user_id', 'amount', 'method', 'transaction_id', 'deposit_date'),
+            cursor, forward, limit, where="status = 'pending'"
+        )
+    
+    def list_orders(self, cursor=None, forward=True, limit=10):
+        # Newest first, seeking on the primary key
+        return self._seek(
+            'SELECT id, user_id, service_id, quantity, total_price, status, order_date FROM orders',
+            'id', ('id', 'user_id', 'service_id', 'quantity', 'total_price', 'status', 'order_date'),
+            cursor, forward, limit, newest_first=True
+        )
+    
+    def list_users(self, cursor=None, forward=True, limit=10):
+        return self._seek(
+            'SELECT user_id, username, first_name, balance, total_orders, banned FROM users',
+            'user_id', ('user_id', 'username', 'first_name', 'balance', 'total_orders', 'banned'),
+            cursor, forward, limit
+        )
+    
+    # Broadcasts
+    def create_broadcast_job(self, admin_id, audience, from_chat_id, message_id, mode='copy'):
+        self.cursor.execute('''INSERT INTO broadcast_jobs (admin_id, audience, mode, from_chat_id, message_id)
+            VALUES (?, ?, ?, ?, ?)''', (admin_id, audience, mode, from_chat_id, message_id))
+        self._commit()
+        return self.cursor.lastrowid
+    
+    def get_broadcast_job(self, job_id):
+        self.cursor.execute('''SELECT id, admin_id, audience, mode, from_chat_id, message_id, status, last_user_id, sent, failed
+            FROM broadcast_jobs WHERE id = ?''', (job_id,))
+        row = self.cursor.fetchone()
+        return self._broadcast_row(row) if row else None
+    
+    def get_unfinished_broadcasts(self):
+        self.cursor.execute('''SELECT id, admin_id, audience, mode, from_chat_id, message_id, status, last_user_id, sent, failed
+            FROM broadcast_jobs WHERE status = 'running' ORDER BY id''')
+        return [self._broadcast_row(row) for row in self.cursor.fetchall()]
+    
+    def _broadcast_row(self, row):
+        keys = ('id', 'admin_id', 'audience', 'mode', 'from_chat_id', 'message_id', 'status', 'last_user_id', 'sent', 'failed')
+        return dict(zip(keys, row))
+    
+    def get_broadcast_recipients(self, audience, after_user_id, limit):
+        # Keyset scan over the users primary key, one chunk at a time
+        if audience == 'depositors':
+            condition = 'AND total_deposits > 0'
+        elif audience == 'active':
+            condition = '''AND (joined_date >= datetime('now', '-7 days') OR EXISTS (
+                SELECT 1 FROM orders WHERE orders.user_id = users.user_id
+                AND order_date >= datetime('now', '-7 days')))'''
+        else:
+            condition = ''
+        
+        self.cursor.execute(f'''SELECT user_id FROM users WHERE banned = 0 AND user_id > ? {condition}
+            ORDER BY user_id LIMIT ?''', (after_user_id, limit))
+        return [row[0] for row in self.cursor.fetchall()]
+    
+    def update_broadcast_progress(self, job_id, last_user_id, sent, failed):
+        self.cursor.execute('''UPDATE broadcast_jobs SET last_user_id = ?, sent = ?, failed = ?
+            WHERE id = ?''', (last_user_id, sent, failed, job_id))
+        self._commit()
+    
+    def finish_broadcast(self, job_id, sent, failed):
+        self.cursor.execute('''UPDATE broadcast_jobs SET status = 'done', sent = ?, failed = ?, finished_date = CURRENT_TIMESTAMP
+            WHERE id = ?''', (sent, failed, job_id))
+        self.cursor.execute('''INSERT INTO broadcast_logs (admin_id, message_type, users_count)
+            SELECT admin_id, audience, ? FROM broadcast_jobs WHERE id = ?''', (sent, job_id))
+        self._commit()
+    
+    # Auto-delete schedule
+    def get_scheduled_deletions(self):
+        self.cursor.execute('SELECT due_at, chat_id, message_id FROM scheduled_deletions')
+        return self.cursor.fetchall()
+    
+    def add_scheduled_deletions(self, rows):
+        # rows: (due_at, chat_id, message_id)
+        self.cursor.executemany('''INSERT OR REPLACE INTO scheduled_deletions (due_at, chat_id, message_id)
+            VALUES (?, ?, ?)''', rows)
+        self._commit()
+    
+    def remove_scheduled_deletions(self, rows):
+        # rows: (chat_id, message_id)
+        self.cursor.executemany('DELETE FROM scheduled_deletions WHERE chat_id = ? AND message_id = ?', rows)
+        self._commit()
+    
+    # Conversation persistence
+    def get_conversation_states(self, name):
+        self.cursor.execute('SELECT key, state FROM conversations WHERE name = ?', (name,))
+        return self.cursor.fetchall()
+    
+    def get_all_user_data(self):
+        self.cursor.execute('SELECT user_id, data FROM user_data')
+        return self.cursor.fetchall()
+    
+    def save_persistence(self, user_rows, dropped_users, state_rows):
+        # user_rows: (user_id, data), state_rows: (name, key, state); a state
+        # of None means the conversation ended. Written in one transaction.
+        self.cursor.executemany('''INSERT INTO user_data (user_id, data) VALUES (?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET data = excluded.data''', user_rows)
+        self.cursor.executemany('DELETE FROM user_data WHERE user_id = ?', [(user_id,) for user_id in dropped_users])
+        self.cursor.executemany('''INSERT INTO conversations (name, key, state) VALUES (?, ?, ?)
+            ON CONFLICT (name, key) DO UPDATE SET state = excluded.state''',
+            [row for row in state_rows if row[2] is not None])
+        self.cursor.executemany('DELETE FROM conversations WHERE name = ? AND key = ?',
+            [(name, key) for name, key, state in state_rows if state is None])
+        self._commit()
+    
+    # Statistics
+    def _bump_stat(self, name, amount=1):
+        # Called inside the caller's transaction
+        self.cursor.execute('''INSERT INTO stats_counters (name, value) VALUES (?, ?)
+            ON CONFLICT (name) DO UPDATE SET value = value + excluded.value''', (name, amount))
+        self.cursor.execute('''INSERT INTO stats_daily (day, name, value) VALUES (date('now'), ?, ?)
+            ON CONFLICT (day, name) DO UPDATE SET value = value + excluded.value''', (name, amount))
+    
+    def backfill_statistics(self):
+        # Seed the counters from the base tables the first time they are created
+        self.cursor.execute('SELECT COUNT(*) FROM stats_counters')
+        if self.cursor.fetchone()[0]:
+            return
+        
+        self.cursor.execute('''INSERT INTO stats_counters (name, value)
+            SELECT 'users', COUNT(*) FROM users
+            UNION ALL SELECT 'orders', COUNT(*) FROM orders
+            UNION ALL SELECT 'deposits', COALESCE(SUM(amount), 0) FROM deposits
+                WHERE status = 'approved'
+        ''')
+        self.cursor.execute('''INSERT INTO stats_daily (day, name, value)
+            SELECT date(joined_date), 'users', COUNT(*) FROM users GROUP BY date(joined_date)
+            UNION ALL SELECT date(order_date), 'orders', COUNT(*) FROM orders GROUP BY date(order_date)
+            UNION ALL SELECT date(approved_date), 'deposits', SUM(amount) FROM deposits
+                WHERE status = 'approved' GROUP BY date(approved_date)
+        ''')
+    
+    def get_statistics(self):
+        self.cursor.execute('SELECT name, value FROM stats_counters')
+        totals = dict(self.cursor.fetchall())
+        self.cursor.execute("SELECT name, value FROM stats_daily WHERE day = date('now')")
+        today = dict(self.cursor.fetchall())
+        
+        return {
+            'total_users': int(totals.get('users', 0)),
+            'total_deposits': totals.get('deposits', 0),
+            'total_orders': int(totals.get('orders', 0)),
+            'today_users': int(today.get('users', 0)),
+            'today_orders': int(today.get('orders', 0))
+        }
@@ -1,17 +1,25 @@
 # keyboards.py
+from functools import lru_cache
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
+# Built markups keyed by (name, db id) -> (settings version, markup).
+# Markups are immutable, so one instance can be sent to every user.
+_markup_cache = {}
+
 def main_menu(db):
-    # Get button texts from database
-    buttons = {
-        'balance': db.get_setting('button_balance'),
-        'services': db.get_setting('button_services'),
-        'prices': db.get_setting('button_prices'),
-        'deposit': db.get_setting('button_deposit'),
-        'invite': db.get_setting('button_invite'),
-        'support': db.get_setting('button_support'),
-        'stats': db.get_setting('button_stats')
-    }
+    cache_key = ('main_menu', id(db))
+    cached = _markup_cache.get(cache_key)
+    if cached is not None and cached[0] == db.settings_version:
+        return cached[1]
+    
+    version = db.settings_version
+    
+    # Get button texts from the settings cache in one lookup
+    settings = db.get_settings([
+        'button_balance', 'button_services', 'button_prices', 'button_deposit',
+        'button_invite', 'button_support', 'button_stats'
+    ])
+    buttons = {key[len('button_'):]: value for key, value in settings.items()}
     
     keyboard = [
         [InlineKeyboardButton(buttons['balance'], callback_data='balance'),
@@ -23,12 +31,16 @@ def main_menu(db):
         [InlineKeyboardButton(buttons['stats'], callback_data='stats')]
     ]
     
-    return InlineKeyboardMarkup(keyboard)
+    markup = InlineKeyboardMarkup(keyboard)
+    _markup_cache[cache_key] = (version, markup)
+    return markup
 
+@lru_cache(maxsize=None)
 def back_to_main():
     keyboard = [[InlineKeyboardButton("🔙 Back to Main Menu", callback_data='main_menu')]]
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=None)
 def admin_panel():
     keyboard = [
         [InlineKeyboardButton("✏️ Edit Welcome Message", callback_data='admin_edit_welcome')],
@@ -38,12 +50,15 @@ def admin_panel():
         [InlineKeyboardButton("🔗 Group Settings", callback_data='admin_group_settings')],
         [InlineKeyboardButton("📢 Broadcast", callback_data='admin_broadcast')],
         [InlineKeyboardButton("👤 User Control", callback_data='admin_user_control')],
+        [InlineKeyboardButton("📥 Pending Deposits", callback_data='admin_list_deposits')],
+        [InlineKeyboardButton("📦 Recent Orders", callback_data='admin_list_orders')],
+        [InlineKeyboardButton("👥 Users", callback_data='admin_list_users')],
         [InlineKeyboardButton("📊 Statistics", callback_data='admin_statistics')],
         [InlineKeyboardButton("🎨 Branding", callback_data='admin_branding')]
     ]
     return InlineKeyboardMarkup(keyboard)
 
-def pagination_keyboard(items, page, total_pages, prefix):
+def pagination_keyboard(items, page, total_pages, prefix, nav_prefix='page_', back_data='admin_panel'):
     keyboard = []
     
     # Add items for current page
@@ -54,18 +69,40 @@ def pagination_keyboard(items, page, total_pages, prefix):
         )])
     
     # Add pagination buttons
+    keyboard.append(_nav_row(page, total_pages, nav_prefix))
+    
+    keyboard.append(_back_row(back_data))
+    
+    return InlineKeyboardMarkup(keyboard)
+
+@lru_cache(maxsize=None)
+def _back_row(back_data):
+    return (InlineKeyboardButton("🔙 Back", callback_data=back_data),)
+
+@lru_cache(maxsize=1024)
+def _nav_row(page, total_pages, nav_prefix):
     nav_buttons = []
     if page > 1:
-        nav_buttons.append(InlineKeyboardButton("⬅️ Previous", callback_data=f"page_{page-1}"))
+        nav_buttons.append(InlineKeyboardButton("⬅️ Previous", callback_data=f"{nav_prefix}{page-1}"))
     
     nav_buttons.append(InlineKeyboardButton(f"{page}/{total_pages}", callback_data='current_page'))
     
     if page < total_pages:
-        nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"page_{page+1}"))
+        nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"{nav_prefix}{page+1}"))
+    
+    return tuple(nav_buttons)
+
+
+def cursor_pagination_keyboard(prev_data, next_data, back_data='admin_panel', action_rows=()):
+    # Prev/Next for keyset listings; the cursor travels in the callback data
+    nav_buttons = []
+    if prev_data:
+        nav_buttons.append(InlineKeyboardButton("⬅️ Previous", callback_data=prev_data))
+    if next_data:
+        nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data=next_data))
     
+    keyboard = list(action_rows)
     if nav_buttons:
         keyboard.append(nav_buttons)
-    
-    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data='admin_panel')])
-    
-    return InlineKeyboardMarkup(keyboard)
+    keyboard.append(_back_row(back_data))
+    return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
@@ -0,0 +1,73 @@
+# maintenance.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def seconds_until(hour, now=None):
+    # Seconds until the next time the local clock reads hour:00
+    now = now or datetime.now()
+    target = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+class DatabaseMaintenance:
+    # Runs ANALYZE, incremental vacuum and a WAL checkpoint once a day at
+    # Config.MAINTENANCE_HOUR, when traffic is lowest, and reports the
+    # database and WAL sizes to the admins.
+    def __init__(self, db, notify, hour=None):
+        self.db = db
+        self.notify = notify
+        self.hour = Config.MAINTENANCE_HOUR if hour is None else hour
+        self.last_report = None
+        self._worker = None
+    
+    def start(self):
+        if self.hour >= 0 and self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(seconds_until(self.hour))
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Database maintenance failed")
+    
+    async def run_once(self):
+        report = await self.db.run_maintenance()
+        self.last_report = report
+        logger.info("Database maintenance done: %s", report)
+        self.notify(self.format_report(report))
+        return report
+    
+    def format_report(self, report):
+        text = "🧹 *Database maintenance*\n\n"
+        text += f"Database: {format_size(report['db_size'])}\n"
+        text += f"WAL: {format_size(report['wal_size'])} before checkpoint, {report['checkpointed_pages']} pages checkpointed"
+        if report['checkpoint_busy']:
+            text += " (checkpoint blocked by readers)"
+        text += "\n"
+        if report['incremental_vacuum']:
+            text += f"Reclaimed: {format_size(report['vacuumed_pages'] * report['page_size'])}\n"
+        else:
+            text += "Incremental vacuum unavailable (database created before it was enabled)\n"
+        text += f"Free space left: {format_size(report['free_pages'] * report['page_size'])}\n"
+        text += f"Took {report['seconds']:.1f}s"
+        return text
@@ -0,0 +1,133 @@
+# membership.py
+import asyncio
+import logging
+import time
+from telegram.constants import ChatMemberStatus
+from telegram.error import BadRequest, TelegramError
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MEMBER_STATUSES = (
+    ChatMemberStatus.OWNER,
+    ChatMemberStatus.ADMINISTRATOR,
+    ChatMemberStatus.MEMBER
+)
+
+def group_chat_id(group_id, group_link):
+    # An explicit group id wins; otherwise a public t.me link gives @username
+    if group_id:
+        return int(group_id) if group_id.lstrip('-').isdigit() else group_id
+    if not group_link:
+        return None
+    
+    name = group_link.rstrip('/').rsplit('/', 1)[-1]
+    if not name or name.startswith('+') or 'joinchat' in group_link:
+        # Private invite links cannot be resolved to a chat
+        return None
+    return name if name.startswith('@') else f"@{name}"
+
+class MembershipChecker:
+    # Caches getChatMember results per user: members for MEMBERSHIP_TTL,
+    # non-members for the shorter MEMBERSHIP_NEGATIVE_TTL. Concurrent checks
+    # for one user share a single API call. Expired member entries keep
+    # passing while they are rechecked in batches in the background.
+    def __init__(self, bot, ttl=None, negative_ttl=None, recheck_interval=5, recheck_concurrency=10):
+        self.bot = bot
+        self.ttl = ttl or Config.MEMBERSHIP_TTL
+        self.negative_ttl = negative_ttl or Config.MEMBERSHIP_NEGATIVE_TTL
+        self.recheck_interval = recheck_interval
+        self.recheck_semaphore = asyncio.Semaphore(recheck_concurrency)
+        self.cache = {}
+        self.in_flight = {}
+        self.stale = {}
+        self.api_calls = 0
+        self.hits = 0
+        self._rechecker = None
+        self._last_prune = time.monotonic()
+    
+    async def is_member(self, chat_id, user_id, force=False):
+        now = time.monotonic()
+        cached = self.cache.get((chat_id, user_id))
+        if cached is not None and not force:
+            is_member, expires = cached
+            if now < expires:
+                self.hits += 1
+                return is_member
+            if is_member:
+                self.hits += 1
+                self.stale[(chat_id, user_id)] = True
+                return True
+        
+        return await self._lookup(chat_id, user_id)
+    
+    async def _lookup(self, chat_id, user_id):
+        key = (chat_id, user_id)
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(chat_id, user_id))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def _fetch(self, chat_id, user_id):
+        self.api_calls += 1
+        try:
+            member = await self.bot.get_chat_member(chat_id, user_id)
+            is_member = member.status in MEMBER_STATUSES or (
+                member.status == ChatMemberStatus.RESTRICTED and member.is_member
+            )
+        except BadRequest as e:
+            if 'user not found' in str(e).lower() or 'participant' in str(e).lower():
+                is_member = False
+            else:
+                # Misconfigured group (bot not in it, wrong id): do not lock users out
+                logger.warning("Membership check in %s failed: %s", chat_id, e)
+                is_member = True
+        except TelegramError as e:
+            logger.warning("Membership check in %s failed: %s", chat_id, e)
+            is_member = True
+        
+        ttl = self.ttl if is_member else self.negative_ttl
+        self.cache[(chat_id, user_id)] = (is_member, time.monotonic() + ttl)
+        self.stale.pop((chat_id, user_id), None)
+        return is_member
+    
+    def invalidate(self, chat_id=None):
+        if chat_id is None:
+            self.cache.clear()
+        else:
+            for key in [key for key in self.cache if key[0] == chat_id]:
+                del self.cache[key]
+    
+    def start(self):
+        if self._rechecker is None:
+            self._rechecker = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._rechecker is not None:
+            self._rechecker.cancel()
+            await asyncio.gather(self._rechecker, return_exceptions=True)
+            self._rechecker = None
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.recheck_interval)
+            batch, self.stale = list(self.stale), {}
+            if batch:
+                await asyncio.gather(*(self._recheck(*key) for key in batch))
+            
+            # Forget users that have not been seen for a whole TTL
+            now = time.monotonic()
+            if now - self._last_prune > self.ttl:
+                expired = [key for key, (_, expires) in self.cache.items() if expires + self.ttl < now]
+                for key in expired:
+                    del self.cache[key]
+                self._last_prune = now
+    
+    async def _recheck(self, chat_id, user_id):
+        async with self.recheck_semaphore:
+            try:
+                await self._lookup(chat_id, user_id)
+            except Exception:
+                logger.exception("Membership recheck for %s failed", user_id)
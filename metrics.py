@@ -0,0 +1,321 @@
+# metrics.py
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from functools import wraps
+from telegram.ext import ApplicationHandlerStop, ConversationHandler
+from telegram.request import BaseRequest
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds in seconds; one extra slot counts everything slower
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Histograms that count things rather than seconds
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 200, 500, 1000)
+BUCKETS = {'smm_db_commit_batch_size': SIZE_BUCKETS}
+
+# name -> (type, help) for the Prometheus output
+METRICS = {
+    'smm_handler_seconds': ('histogram', "Handler callback latency"),
+    'smm_handler_errors_total': ('counter', "Handler callbacks that raised"),
+    'smm_function_seconds': ('histogram', "Latency of instrumented functions"),
+    'smm_function_errors_total': ('counter', "Instrumented functions that raised"),
+    'smm_db_seconds': ('histogram', "Database call latency as seen by the caller"),
+    'smm_db_errors_total': ('counter', "Database calls that raised"),
+    'smm_db_commit_batch_size': ('histogram', "Writes per group commit"),
+    'smm_db_commit_seconds': ('histogram', "Group commit transaction time on the writer thread"),
+    'smm_db_commit_wait_seconds': ('histogram', "Time a write waited in the group-commit queue"),
+    'smm_bot_api_seconds': ('histogram', "Bot API request latency"),
+    'smm_bot_api_calls_total': ('counter', "Bot API requests by method"),
+    'smm_bot_api_errors_total': ('counter', "Bot API requests that failed"),
+    'smm_log_errors_total': ('counter', "ERROR log records by logger"),
+    'smm_sql_statements_total': ('counter', "SQL statements run by handler (SQL_TRACE)"),
+    'smm_sql_slow_total': ('counter', "SQL statements slower than SQL_SLOW_MS by handler"),
+    'smm_sql_budget_violations_total': ('counter', "Handler calls over SQL_QUERY_BUDGET statements"),
+    'smm_sql_repeated_total': ('counter', "Over-budget handler calls repeating one statement (N+1)")
+}
+
+class Histogram:
+    # Fixed buckets: recording is one bisect and three additions
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+    
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+class Registry:
+    # Histograms and counters are keyed by (name, labels), where labels is a
+    # tuple of (key, value) pairs. Gauges are read from callables on render.
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+    
+    def observe(self, name, labels, seconds):
+        histogram = self.histograms.get((name, labels))
+        if histogram is None:
+            histogram = self.histograms[(name, labels)] = Histogram(BUCKETS.get(name, LATENCY_BUCKETS))
+        histogram.observe(seconds)
+    
+    def inc(self, name, labels=(), amount=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+    
+    def gauge(self, name, help_text, read):
+        self.gauges[name] = (help_text, read)
+    
+    def render(self):
+        # Prometheus text exposition format 0.0.4
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = self.histograms if kind == 'histogram' else self.counters
+            keys = sorted(key for key in series if key[0] == name)
+            if not keys:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key in keys:
+                labels = key[1]
+                if kind == 'counter':
+                    lines.append(f"{name}{_labels(labels)} {series[key]}")
+                    continue
+                histogram = series[key]
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{_labels(labels)} {histogram.total}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        
+        for name, (help_text, read) in sorted(self.gauges.items()):
+            try:
+                value = read()
+            except Exception:
+                logger.exception("Reading gauge %s failed", name)
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+    
+    def summary(self, top=8):
+        # Short text for the admin /metrics command
+        text = "📈 *Metrics*\n\n"
+        
+        handlers = [
+            (labels[0][1], histogram) for (name, labels), histogram in self.histograms.items()
+            if name == 'smm_handler_seconds'
+        ]
+        handlers.sort(key=lambda item: item[1].quantile(0.95), reverse=True)
+        if handlers:
+            text += "*Slowest handlers (p50 / p95, ms)*\n"
+            for handler, histogram in handlers[:top]:
+                text += f"`{handler}`: {_ms(histogram.quantile(0.5))} / {_ms(histogram.quantile(0.95))} ({histogram.count})\n"
+            text += "\n"
+        
+        errors = {
+            name: sum(value for (series, _), value in self.counters.items() if series == name)
+            for name in ('smm_handler_errors_total', 'smm_db_errors_total', 'smm_bot_api_errors_total', 'smm_log_errors_total')
+        }
+        text += "*Errors*\n"
+        text += f"Handlers: {errors['smm_handler_errors_total']} | DB: {errors['smm_db_errors_total']}\n"
+        text += f"Bot API: {errors['smm_bot_api_errors_total']} | Logged: {errors['smm_log_errors_total']}\n\n"
+        
+        api_calls = sum(value for (series, _), value in self.counters.items() if series == 'smm_bot_api_calls_total')
+        db = [histogram for (name, _), histogram in self.histograms.items() if name == 'smm_db_seconds']
+        text += f"Bot API calls: {api_calls}\n"
+        text += f"DB calls: {sum(histogram.count for histogram in db)}\n"
+        
+        for name, (help_text, read) in sorted(self.gauges.items()):
+            try:
+                text += f"{help_text}: {read()}\n"
+            except Exception:
+                continue
+        return text
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+def _ms(seconds):
+    return "inf" if seconds == float('inf') else f"{seconds * 1000:g}"
+
+registry = Registry()
+
+def timed(name):
+    # Decorator for plain and async functions
+    labels = (('function', name),)
+    
+    def decorate(function):
+        if asyncio.iscoroutinefunction(function):
+            @wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                except Exception:
+                    registry.inc('smm_function_errors_total', labels)
+                    raise
+                finally:
+                    registry.observe('smm_function_seconds', labels, time.perf_counter() - started)
+            return async_wrapper
+        
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                registry.inc('smm_function_errors_total', labels)
+                raise
+            finally:
+                registry.observe('smm_function_seconds', labels, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+def instrument_handlers(application):
+    # Times every registered callback, including ConversationHandler entry
+    # points, states and fallbacks. ApplicationHandlerStop is flow control.
+    def wrap(handler):
+        callback = handler.callback
+        labels = (('handler', getattr(callback, '__name__', repr(callback))),)
+        
+        @wraps(callback)
+        async def timed_callback(update, context):
+            started = time.perf_counter()
+            try:
+                return await callback(update, context)
+            except ApplicationHandlerStop:
+                raise
+            except Exception:
+                registry.inc('smm_handler_errors_total', labels)
+                raise
+            finally:
+                registry.observe('smm_handler_seconds', labels, time.perf_counter() - started)
+        
+        handler.callback = timed_callback
+    
+    for handler in iter_handlers(application):
+        wrap(handler)
+
+def iter_handlers(application):
+    # Every handler with a callback, looking inside ConversationHandlers
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if isinstance(handler, ConversationHandler):
+                yield from handler.entry_points
+                for state_handlers in handler.states.values():
+                    yield from state_handlers
+                yield from handler.fallbacks
+            else:
+                yield handler
+
+class InstrumentedRequest(BaseRequest):
+    # Wraps the bot's request object to count and time Bot API calls
+    def __init__(self, request):
+        self.request = request
+    
+    @property
+    def read_timeout(self):
+        return self.request.read_timeout
+    
+    async def initialize(self):
+        await self.request.initialize()
+    
+    async def shutdown(self):
+        await self.request.shutdown()
+    
+    async def do_request(self, url, method, request_data=None, read_timeout=BaseRequest.DEFAULT_NONE,
+                         write_timeout=BaseRequest.DEFAULT_NONE, connect_timeout=BaseRequest.DEFAULT_NONE,
+                         pool_timeout=BaseRequest.DEFAULT_NONE):
+        labels = (('method', url.rsplit('/', 1)[-1]),)
+        registry.inc('smm_bot_api_calls_total', labels)
+        started = time.perf_counter()
+        try:
+            code, payload = await self.request.do_request(
+                url, method, request_data, read_timeout=read_timeout, write_timeout=write_timeout,
+                connect_timeout=connect_timeout, pool_timeout=pool_timeout
+            )
+        except Exception:
+            registry.inc('smm_bot_api_errors_total', labels)
+            raise
+        finally:
+            registry.observe('smm_bot_api_seconds', labels, time.perf_counter() - started)
+        if code >= 400:
+            registry.inc('smm_bot_api_errors_total', labels)
+        return code, payload
+
+class ErrorCounter(logging.Handler):
+    # Counts ERROR records, so failures that are logged and swallowed
+    # (background workers, PTB's own handler errors) still show up
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+    
+    def emit(self, record):
+        registry.inc('smm_log_errors_total', (('logger', record.name),))
+
+class MetricsServer:
+    # Minimal HTTP endpoint serving registry.render() to a Prometheus scraper
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._server = None
+    
+    async def start(self):
+        if self.port and self._server is None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            logger.info("Metrics on http://%s:%s/metrics", self.host, self.port)
+    
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b'\r\n', b'\n', b''):
+                pass
+            
+            parts = request_line.split()
+            if len(parts) >= 2 and parts[0] == b'GET' and parts[1].split(b'?')[0] in (b'/', b'/metrics'):
+                status, body = b'200 OK', registry.render().encode()
+            else:
+                status, body = b'404 Not Found', b'not found\n'
+            writer.write(
+                b'HTTP/1.1 ' + status + b'\r\n'
+                b'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                b'Content-Length: ' + str(len(body)).encode() + b'\r\n'
+                b'Connection: close\r\n\r\n' + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            logger.debug("Metrics request dropped: %r", e)
+        finally:
+            writer.close()
@@ -0,0 +1,156 @@
+# notifications.py
+import asyncio
+import logging
+from telegram.constants import ParseMode, MessageLimit
+from telegram.error import BadRequest, RetryAfter, TelegramError
+from broadcast import RateLimiter
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class AdminNotifier:
+    # Admin notifications are queued by the handlers and sent by one
+    # background worker. A quiet queue sends each event as it comes; during a
+    # burst everything that piled up is merged into one digest per admin, so
+    # admins get at most one message per interval.
+    def __init__(self, bot, db, interval=None):
+        self.bot = bot
+        self.db = db
+        self.interval = Config.NOTIFY_DIGEST_INTERVAL if interval is None else interval
+        self.queue = asyncio.Queue()
+        self.sent_messages = 0
+        self.failed_messages = 0
+        self._worker = None
+    
+    def notify(self, text):
+        self.queue.put_nowait(text)
+    
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        
+        # Deliver whatever was still queued at shutdown
+        events = self._drain()
+        if events:
+            await self._deliver(events)
+    
+    def _drain(self):
+        events = []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+    
+    async def _run(self):
+        while True:
+            events = [await self.queue.get()]
+            events.extend(self._drain())
+            try:
+                await self._deliver(events)
+            except Exception:
+                logger.exception("Admin notification delivery failed")
+            await asyncio.sleep(self.interval)
+    
+    async def _deliver(self, events):
+        if len(events) == 1:
+            messages = events
+        else:
+            messages = self._digest(events)
+        
+        # Admins in parallel, each admin's messages in order
+        admins = await self.db.get_admins()
+        await asyncio.gather(*(self._send(admin_id, messages) for admin_id in admins))
+    
+    def _digest(self, events):
+        # Split into as few messages as fit under Telegram's length limit
+        header = f"📬 *{len(events)} new events*\n\n"
+        separator = "\n\n➖➖➖\n\n"
+        messages = []
+        current = header
+        for event in events:
+            chunk = event if current == header else separator + event
+            if len(current) + len(chunk) > MessageLimit.MAX_TEXT_LENGTH and current != header:
+                messages.append(current)
+                current = header + event
+            else:
+                current += chunk
+        messages.append(current)
+        return messages
+    
+    async def _send(self, admin_id, messages):
+        for text in messages:
+            try:
+                try:
+                    await self.bot.send_message(admin_id, text, parse_mode=ParseMode.MARKDOWN)
+                except BadRequest as e:
+                    # One event with broken Markdown must not lose the whole digest
+                    if "can't parse entities" not in str(e).lower():
+                        raise
+                    logger.warning("Notification to admin %s sent as plain text: %s", admin_id, e)
+                    await self.bot.send_message(admin_id, text)
+                self.sent_messages += 1
+            except TelegramError as e:
+                self.failed_messages += 1
+                logger.warning("Notification to admin %s failed: %s", admin_id, e)
+
+class UserNotifier:
+    # Sends one-off messages to many users (deposit decisions and the like)
+    # from background tasks, so the admin who triggered them gets an answer
+    # right away. Sends run concurrently under the limiter passed in, which
+    # SMMBot shares with the broadcast engine and the auto-deleter.
+    def __init__(self, bot, rate=None, concurrency=None, limiter=None):
+        self.bot = bot
+        self.limiter = limiter or RateLimiter(rate or Config.BROADCAST_RATE)
+        self.semaphore = asyncio.Semaphore(concurrency or Config.BROADCAST_CONCURRENCY)
+        self.sent_messages = 0
+        self.failed_messages = 0
+        self._tasks = set()
+    
+    def send_many(self, messages):
+        # messages: (chat_id, text)
+        if not messages:
+            return
+        task = asyncio.create_task(self._send_all(messages))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def stop(self):
+        # Let queued notifications finish before shutting down
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    async def _send_all(self, messages):
+        await asyncio.gather(*(self._send(chat_id, text) for chat_id, text in messages))
+    
+    async def _send(self, chat_id, text):
+        parse_mode = ParseMode.MARKDOWN
+        retries = 1
+        async with self.semaphore:
+            while True:
+                await self.limiter.wait()
+                try:
+                    await self.bot.send_message(chat_id, text, parse_mode=parse_mode)
+                    self.sent_messages += 1
+                    return
+                except RetryAfter as e:
+                    self.limiter.pause(e.retry_after)
+                    if not retries:
+                        break
+                    retries -= 1
+                except BadRequest as e:
+                    # Raw user text (a transaction ID) can break the Markdown; send it plain
+                    if parse_mode is None or "can't parse entities" not in str(e).lower():
+                        logger.warning("Notification to user %s failed: %s", chat_id, e)
+                        break
+                    logger.warning("Notification to user %s resent as plain text: %s", chat_id, e)
+                    parse_mode = None
+                except TelegramError as e:
+                    logger.warning("Notification to user %s failed: %s", chat_id, e)
+                    break
+            self.failed_messages += 1
@@ -0,0 +1,118 @@
+# persistence.py
+import asyncio
+import json
+import logging
+from telegram.ext import BasePersistence, PersistenceInput
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class SQLitePersistence(BasePersistence):
+    # Keeps conversation states and user_data in the bot's SQLite database.
+    # The Application hands over dirty entries every update_interval seconds;
+    # they are buffered here and written in one transaction per round.
+    def __init__(self, db, update_interval=None):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval or Config.PERSISTENCE_INTERVAL
+        )
+        self.db = db
+        self._user_data = {}
+        self._conversations = {}
+        self._dirty_users = {}
+        self._dropped_users = set()
+        self._dirty_states = {}
+        self._flush_task = None
+        self.flushes = 0
+    
+    async def get_user_data(self):
+        rows = await self.db.get_all_user_data()
+        self._user_data = {user_id: json.loads(data) for user_id, data in rows}
+        return {user_id: dict(data) for user_id, data in self._user_data.items()}
+    
+    async def get_chat_data(self):
+        return {}
+    
+    async def get_bot_data(self):
+        return {}
+    
+    async def get_callback_data(self):
+        return None
+    
+    async def get_conversations(self, name):
+        rows = await self.db.get_conversation_states(name)
+        conversations = {tuple(json.loads(key)): state for key, state in rows}
+        self._conversations[name] = dict(conversations)
+        return conversations
+    
+    async def update_conversation(self, name, key, new_state):
+        if self._conversations.setdefault(name, {}).get(key) == new_state:
+            return
+        self._conversations[name][key] = new_state
+        self._dirty_states[(name, key)] = new_state
+        self._schedule_flush()
+    
+    async def update_user_data(self, user_id, data):
+        if self._user_data.get(user_id) == data:
+            return
+        # The Application passes its live dict, so keep a snapshot to compare against
+        self._user_data[user_id] = dict(data)
+        self._dirty_users[user_id] = self._user_data[user_id]
+        self._dropped_users.discard(user_id)
+        self._schedule_flush()
+    
+    async def drop_user_data(self, user_id):
+        self._user_data.pop(user_id, None)
+        self._dirty_users.pop(user_id, None)
+        self._dropped_users.add(user_id)
+        self._schedule_flush()
+    
+    async def update_chat_data(self, chat_id, data):
+        pass
+    
+    async def drop_chat_data(self, chat_id):
+        pass
+    
+    async def update_bot_data(self, data):
+        pass
+    
+    async def update_callback_data(self, data):
+        pass
+    
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+    
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+    
+    async def refresh_bot_data(self, bot_data):
+        pass
+    
+    def _schedule_flush(self):
+        # The Application updates all dirty entries in one gather, so a flush
+        # scheduled for the next loop iteration collects the whole round
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._write())
+    
+    async def _write(self):
+        await asyncio.sleep(0)
+        users, self._dirty_users = self._dirty_users, {}
+        dropped, self._dropped_users = self._dropped_users, set()
+        states, self._dirty_states = self._dirty_states, {}
+        if not (users or dropped or states):
+            return
+        
+        try:
+            await self.db.save_persistence(
+                [(user_id, json.dumps(data)) for user_id, data in users.items()],
+                list(dropped),
+                [(name, json.dumps(list(key)), state) for (name, key), state in states.items()]
+            )
+            self.flushes += 1
+        except Exception:
+            logger.exception("Saving conversation data failed")
+    
+    async def flush(self):
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._write()
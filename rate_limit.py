@@ -0,0 +1,48 @@
+# rate_limit.py
+import time
+from collections import OrderedDict
+
+class TokenBucketLimiter:
+    # Per-user token bucket: each user may burst `burst` updates and then
+    # gets one more every `interval` seconds. Buckets live in an OrderedDict
+    # kept in last-seen order, so buckets that have refilled completely (and
+    # would behave like a fresh one) are evicted from the front in O(1).
+    def __init__(self, interval, burst, clock=time.monotonic):
+        self.interval = interval
+        self.burst = burst
+        self.clock = clock
+        self.idle_after = interval * burst
+        self.buckets = OrderedDict()
+        self.allowed = 0
+        self.dropped = 0
+    
+    def allow(self, user_id):
+        if self.interval <= 0:
+            return True
+        
+        now = self.clock()
+        self._evict(now)
+        
+        bucket = self.buckets.pop(user_id, None)
+        if bucket is None:
+            tokens = self.burst
+        else:
+            tokens, last = bucket
+            tokens = min(self.burst, tokens + (now - last) / self.interval)
+        
+        if tokens >= 1:
+            self.buckets[user_id] = (tokens - 1, now)
+            self.allowed += 1
+            return True
+        
+        self.buckets[user_id] = (tokens, now)
+        self.dropped += 1
+        return False
+    
+    def _evict(self, now):
+        buckets = self.buckets
+        while buckets:
+            user_id, (_, last) = next(iter(buckets.items()))
+            if now - last < self.idle_after:
+                break
+            del buckets[user_id]
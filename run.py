@@ -9,6 +9,7 @@ def main():
     
     print("🤖 SMM Panel Bot is starting...")
     print(f"👑 Admin IDs: {Config.ADMIN_IDS}")
+    print(f"📡 Mode: {Config.RUN_MODE}")
     
     # Run bot
     bot.run()
@@ -0,0 +1,170 @@
+# sql_trace.py
+import contextvars
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from config import Config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# The handler invocation the current statement belongs to. Set by
+# trace_handlers and carried into the DB threads by AsyncDatabase.
+current_scope = contextvars.ContextVar('sql_trace_scope', default=None)
+
+# Literals replaced by ? so repeats of one statement with different values group together
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+def normalize(sql):
+    return ' '.join(_LITERALS.sub('?', sql).split())
+
+class Scope:
+    # Statements run on behalf of one handler call
+    __slots__ = ('update_id', 'handler', 'statements', 'queries', 'slow')
+    
+    def __init__(self, update_id, handler):
+        self.update_id = update_id
+        self.handler = handler
+        self.statements = 0
+        self.queries = Counter()
+        self.slow = 0
+
+class TracingCursor(sqlite3.Cursor):
+    # Times execute/executemany so slow statements can be logged with their
+    # plan. The tracer is set on per-tracer subclasses (SQLTracer.cursor_class).
+    tracer = None
+    
+    def execute(self, sql, parameters=()):
+        return self.tracer.run(self, super().execute, sql, parameters, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        sample = seq_of_parameters[0] if seq_of_parameters else ()
+        return self.tracer.run(self, super().executemany, sql, seq_of_parameters, sample)
+
+class SQLTracer:
+    # Attributes every SQLite statement to the update and handler that caused
+    # it, logs statements slower than slow_ms with EXPLAIN QUERY PLAN, and
+    # flags handler calls running more than budget statements, listing the
+    # ones repeated repeat_threshold times or more (N+1 patterns).
+    def __init__(self, slow_ms=None, budget=None, repeat_threshold=3):
+        self.slow_ms = Config.SQL_SLOW_MS if slow_ms is None else slow_ms
+        self.budget = Config.SQL_QUERY_BUDGET if budget is None else budget
+        self.repeat_threshold = repeat_threshold
+        self.cursor_class = type('TracingCursor', (TracingCursor,), {'tracer': self})
+        
+        # Statements outside any handler (workers, persistence, maintenance)
+        self.background_statements = 0
+        self.background_slow = 0
+        self._lock = threading.Lock()
+        
+        # Set while a TracingCursor call or an EXPLAIN runs on this thread,
+        # so the trace callback does not count the statement a second time
+        self._local = threading.local()
+    
+    def on_statement(self, sql):
+        # sqlite3 trace callback: called for every statement a traced connection runs
+        if getattr(self._local, 'busy', False):
+            return
+        self._record(normalize(sql))
+    
+    def _record(self, query):
+        scope = current_scope.get()
+        if scope is None:
+            with self._lock:
+                self.background_statements += 1
+            return
+        scope.statements += 1
+        scope.queries[query] += 1
+    
+    def run(self, cursor, execute, sql, parameters, sample):
+        self._record(normalize(sql))
+        self._local.busy = True
+        started = time.perf_counter()
+        try:
+            return execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._local.busy = False
+            if elapsed * 1000 >= self.slow_ms:
+                self._slow(cursor.connection, sql, sample, elapsed)
+    
+    def _slow(self, connection, sql, parameters, elapsed):
+        scope = current_scope.get()
+        if scope is None:
+            with self._lock:
+                self.background_slow += 1
+            where = "background"
+        else:
+            scope.slow += 1
+            where = f"{scope.handler} (update {scope.update_id})"
+        logger.warning(
+            "Slow query %.1f ms in %s: %s\n%s",
+            elapsed * 1000, where, ' '.join(sql.split()), self.explain(connection, sql, parameters)
+        )
+    
+    def explain(self, connection, sql, parameters=()):
+        self._local.busy = True
+        try:
+            rows = connection.execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            return f"  (no plan: {e})"
+        finally:
+            self._local.busy = False
+        
+        # Rows are (id, parent, notused, detail); indent children under their parent
+        depth = {0: 0}
+        lines = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, 0) + 1
+            lines.append('  ' * depth[node] + detail)
+        return '\n'.join(lines) or "  (no plan)"
+    
+    def check(self, scope):
+        # Called when a handler call returns
+        labels = (('handler', scope.handler),)
+        if scope.statements:
+            metrics.registry.inc('smm_sql_statements_total', labels, scope.statements)
+        if scope.slow:
+            metrics.registry.inc('smm_sql_slow_total', labels, scope.slow)
+        if scope.statements <= self.budget:
+            return
+        
+        metrics.registry.inc('smm_sql_budget_violations_total', labels)
+        repeated = [
+            (query, count) for query, count in scope.queries.most_common(5)
+            if count >= self.repeat_threshold
+        ]
+        if repeated:
+            metrics.registry.inc('smm_sql_repeated_total', labels)
+        logger.warning(
+            "%s ran %d SQL statements for update %s (budget %d)%s",
+            scope.handler, scope.statements, scope.update_id, self.budget,
+            ''.join(f"\n  {count}x {query}" for query, count in repeated)
+        )
+
+def trace_handlers(application, tracer):
+    # Opens a Scope around every handler callback so the statements it causes
+    # are counted against it, then checks the scope against the budget
+    def wrap(handler):
+        callback = handler.callback
+        name = getattr(callback, '__name__', repr(callback))
+        
+        @wraps(callback)
+        async def traced_callback(update, context):
+            scope = Scope(getattr(update, 'update_id', None), name)
+            token = current_scope.set(scope)
+            try:
+                return await callback(update, context)
+            finally:
+                current_scope.reset(token)
+                tracer.check(scope)
+        
+        handler.callback = traced_callback
+    
+    for handler in metrics.iter_handlers(application):
+        wrap(handler)
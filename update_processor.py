@@ -0,0 +1,80 @@
+# update_processor.py
+import asyncio
+from telegram.ext import BaseUpdateProcessor
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    # Runs updates from different users in parallel, up to a limit, while
+    # updates from the same user run strictly one after another in arrival
+    # order, so ConversationHandler states (DEPOSIT_AMOUNT, ORDER_LINK, ...)
+    # always see a user's messages in sequence.
+    def __init__(self, max_concurrent_updates):
+        # The base class takes its semaphore before we know whose update it
+        # is. Keep it out of the way and take a slot only once it is this
+        # user's turn, so one user's backlog cannot occupy every slot. The
+        # real limit is self.limit.
+        super().__init__(max_concurrent_updates=2 ** 30)
+        self.limit = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._users = {}
+        self.pending = 0
+        self.running = 0
+        self.processed = 0
+    
+    @property
+    def queue_depth(self):
+        # Updates accepted but not finished yet
+        return self.pending
+    
+    @property
+    def waiting(self):
+        # Updates queued behind the same user or for a free slot
+        return self.pending - self.running
+    
+    @property
+    def busy_users(self):
+        return len(self._users)
+    
+    def _key(self, update):
+        user = getattr(update, 'effective_user', None)
+        if user is not None:
+            return user.id
+        chat = getattr(update, 'effective_chat', None)
+        return chat.id if chat is not None else None
+    
+    async def do_process_update(self, update, coroutine):
+        key = self._key(update)
+        self.pending += 1
+        try:
+            if key is None:
+                await self._run(coroutine)
+                return
+            
+            # asyncio.Lock wakes waiters in FIFO order, which keeps per-user order
+            entry = self._users.get(key)
+            if entry is None:
+                entry = self._users[key] = [asyncio.Lock(), 0]
+            entry[1] += 1
+            try:
+                async with entry[0]:
+                    await self._run(coroutine)
+            finally:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._users[key]
+        finally:
+            self.pending -= 1
+    
+    async def _run(self, coroutine):
+        async with self._slots:
+            self.running += 1
+            try:
+                await coroutine
+            finally:
+                self.running -= 1
+                self.processed += 1
+    
+    async def initialize(self):
+        pass
+    
+    async def shutdown(self):
+        pass
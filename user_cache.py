@@ -0,0 +1,142 @@
+# user_cache.py
+import asyncio
+import logging
+from collections import OrderedDict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class SeenUsers:
+    # Bounded LRU of registered users and their last known profile fields.
+    # Known users skip the register write entirely; changed names are queued
+    # and written in one batch per flush interval.
+    def __init__(self, db, max_size=None, flush_interval=None):
+        self.db = db
+        self.max_size = max_size or Config.SEEN_USERS_CACHE_SIZE
+        self.flush_interval = flush_interval or Config.PROFILE_FLUSH_INTERVAL
+        self.profiles = OrderedDict()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.registered = 0
+        self.flushed = 0
+        self._flusher = None
+    
+    async def touch(self, user, referral_by=None):
+        # Returns True when this call registered a new user
+        profile = (user.username, user.first_name, user.last_name)
+        cached = self.profiles.get(user.id)
+        
+        if cached is None:
+            self.misses += 1
+            cached = await self.db.get_user_profile(user.id)
+            if cached is None:
+                await self.db.register_user(user.id, *profile, referral_by)
+                self.registered += 1
+                self._remember(user.id, profile)
+                return True
+        else:
+            self.hits += 1
+        
+        if cached != profile:
+            self.pending[user.id] = profile
+        self._remember(user.id, profile)
+        return False
+    
+    def _remember(self, user_id, profile):
+        self.profiles[user_id] = profile
+        self.profiles.move_to_end(user_id)
+        if len(self.profiles) > self.max_size:
+            self.profiles.popitem(last=False)
+    
+    async def flush(self):
+        if not self.pending:
+            return 0
+        
+        rows = [(*profile, user_id) for user_id, profile in self.pending.items()]
+        self.pending = {}
+        await self.db.update_user_profiles(rows)
+        self.flushed += len(rows)
+        return len(rows)
+    
+    def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Profile flush failed")
+
+class UserProfile:
+    # Balance-screen view of a user, loaded from one users row
+    __slots__ = ('user_id', 'balance', 'total_orders', 'total_deposits', 'referrals')
+    
+    def __init__(self, user_id, balance=0, total_orders=0, total_deposits=0, referrals=0):
+        self.user_id = user_id
+        self.balance = balance
+        self.total_orders = total_orders
+        self.total_deposits = total_deposits
+        self.referrals = referrals
+    
+    def referral_earnings(self, invite_bonus):
+        return self.referrals * invite_bonus
+
+class ProfileCache:
+    # Bounded LRU of UserProfile records. Write paths that change a user's
+    # balance or counters invalidate the entry; a load that raced with a
+    # write for the same user is returned but not cached.
+    def __init__(self, max_size=None):
+        self.max_size = max_size or Config.PROFILE_CACHE_SIZE
+        self.profiles = OrderedDict()
+        # user_id -> [invalidations, loads in flight], kept only while loading
+        self.loading = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, user_id):
+        profile = self.profiles.get(user_id)
+        if profile is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.profiles.move_to_end(user_id)
+        return profile
+    
+    def begin_load(self, user_id):
+        # Every begin_load must be matched by a put, even if the load failed
+        entry = self.loading.get(user_id)
+        if entry is None:
+            entry = self.loading[user_id] = [0, 0]
+        entry[1] += 1
+        return entry[0]
+    
+    def put(self, user_id, profile, version):
+        # profile is None when the load failed
+        entry = self.loading[user_id]
+        entry[1] -= 1
+        if not entry[1]:
+            del self.loading[user_id]
+        if profile is None or version != entry[0]:
+            return
+        self.profiles[profile.user_id] = profile
+        self.profiles.move_to_end(profile.user_id)
+        if len(self.profiles) > self.max_size:
+            self.profiles.popitem(last=False)
+    
+    def invalidate(self, *user_ids):
+        for user_id in user_ids:
+            self.profiles.pop(user_id, None)
+            entry = self.loading.get(user_id)
+            if entry is not None:
+                entry[0] += 1
@@ -0,0 +1,109 @@
+# webhook_check.py
+# Starts SMMBot's webhook listener against the benchmark's stand-in Bot API
+# and posts updates to it the way Telegram does: a request with the wrong
+# secret token must be refused, one with the right token must reach the
+# handlers. Exits non-zero if any check fails.
+#
+#   python webhook_check.py
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+
+SECRET = 'webhook-check-secret'
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def configure():
+    # Config reads the environment at import, so this runs before bot is imported
+    workdir = tempfile.mkdtemp(prefix='smm-webhook-')
+    os.environ.update({
+        'DATABASE_PATH': os.path.join(workdir, 'webhook.db'),
+        'ADMIN_IDS': '1',
+        'ANTI_SPAM_DELAY': '0',
+        'MAINTENANCE_HOUR': '-1',
+        'METRICS_PORT': '0',
+        'RUN_MODE': 'webhook',
+        'WEBHOOK_URL': 'https://bot.example.com',
+        'WEBHOOK_PATH': 'telegram',
+        'WEBHOOK_SECRET': SECRET,
+        'WEBHOOK_LISTEN': '127.0.0.1',
+        'WEBHOOK_PORT': str(free_port())
+    })
+
+async def wait_for(condition, timeout=5.0):
+    # Updates are processed after the listener has answered the POST
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition() and loop.time() < deadline:
+        await asyncio.sleep(0.02)
+    return condition()
+
+async def check():
+    import httpx
+    import bot as bot_module
+    from config import Config
+    from benchmark import make_fake_request, UpdateFactory
+    
+    api = make_fake_request()()
+    smm = bot_module.SMMBot('123456:WEBHOOK', request=api)
+    app = smm.application
+    factory = UpdateFactory(app.bot)
+    options = bot_module.webhook_options()
+    url = f"http://{options['listen']}:{options['port']}/{options['url_path']}"
+    
+    await app.initialize()
+    await smm.post_init(app)
+    await app.start()
+    await app.updater.start_webhook(**options)
+    try:
+        async with httpx.AsyncClient() as client:
+            wrong = await client.post(
+                url, json=factory.message(1000, '/start').to_dict(), headers={SECRET_HEADER: 'wrong'}
+            )
+            missing = await client.post(url, json=factory.message(1000, '/start').to_dict())
+            right = await client.post(
+                url, json=factory.message(1000, '/start').to_dict(), headers={SECRET_HEADER: SECRET}
+            )
+        delivered = await wait_for(lambda: api.calls['sendMessage'] >= 1)
+    finally:
+        await app.updater.stop()
+        await app.stop()
+        await smm.post_stop(app)
+        await app.shutdown()
+        await smm.shutdown(app)
+    
+    # Without a public URL PTB would register the listen address with Telegram
+    public_url = Config.WEBHOOK_URL
+    Config.WEBHOOK_URL = ''
+    try:
+        bot_module.webhook_options()
+        refused_without_url = False
+    except ValueError:
+        refused_without_url = True
+    finally:
+        Config.WEBHOOK_URL = public_url
+    
+    return [
+        ("setWebhook registered the public URL", api.calls['setWebhook'] == 1),
+        ("wrong secret refused with 403", wrong.status_code == 403),
+        ("missing secret refused with 403", missing.status_code == 403),
+        ("right secret accepted with 200", right.status_code == 200),
+        ("only the accepted update reached /start", delivered and api.calls['sendMessage'] == 1),
+        ("empty WEBHOOK_URL refused before starting", refused_without_url)
+    ]
+
+def main():
+    configure()
+    results = asyncio.run(check())
+    for name, ok in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+    sys.exit(0 if all(ok for _, ok in results) else 1)
+
+if __name__ == "__main__":
+    main()